@@ -0,0 +1,87 @@
+# Alexander Gottuso 87747555
+
+from collections import namedtuple
+import argparse
+import columns
+import project4
+
+Replay = namedtuple('Replay', ('game', 'commands', 'game_over', 'snapshots', 'ticks', 'cleared'))
+
+def read_script(lines: [str]) -> (columns.Size or [str], [str]):
+    """
+    Given the lines of a script in the same format that
+    project4 reads from the user, returns its initial
+    field and the commands that follow it.
+    """
+    size = columns.Size(int(lines[0]), int(lines[1]))
+    if lines[2].strip().upper() == 'EMPTY':
+        return size, lines[3:]
+    else:
+        # trailing spaces are easily lost from script files
+        field = [row.ljust(size.columns) for row in lines[3:3 + size.rows]]
+        return field, lines[3 + size.rows:]
+
+def run_script(field: columns.Size or [str], commands: [str], snapshots: {int} = ()) -> Replay:
+    """
+    Runs the given commands against a new game built from the
+    given field without displaying anything, stopping at the
+    first quit command or when the game ends. The board is kept
+    after each number of commands that is in snapshots. The ticks
+    the game survived and the jewels they cleared are counted.
+    """
+    game = columns.GameState(field)
+    game.fall()
+    game.find_matches()
+
+    count = 0
+    ticks = 0
+    cleared = 0
+    game_over = False
+    kept = [(0, project4.render_field(game))] if 0 in snapshots else []
+
+    for command in commands:
+        # a tick clears every jewel that is matched before it,
+        # including those matched as the game was set up
+        matched = game._matched() if command == '' else 0
+        try:
+            if not project4.apply_command(game, command):
+                break
+        except columns.GameOverError:
+            game_over = True
+        else:
+            ticks += command == ''
+            cleared += matched
+
+        count += 1
+        if count in snapshots:
+            kept.append((count, project4.render_field(game)))
+        if game_over:
+            break
+
+    return Replay(game, count, game_over, kept, ticks, cleared)
+
+def run() -> None:
+    """
+    Replays a script file without any interaction,
+    printing only the chosen snapshots and the final board.
+    """
+    parser = argparse.ArgumentParser(description='Replays a Columns script without any interaction.')
+    parser.add_argument('script', help='file holding the field setup and commands, as typed into project4')
+    parser.add_argument('-s', '--snapshot', type=int, action='append', default=[],
+        help='also show the board after this many commands (may be repeated)')
+    arguments = parser.parse_args()
+
+    with open(arguments.script) as script:
+        field, commands = read_script(script.read().splitlines())
+
+    replay = run_script(field, commands, set(arguments.snapshot))
+    for count, frame in replay.snapshots:
+        print(f'after {count} commands:')
+        print(frame, end='')
+
+    print(project4.render_field(replay.game), end='')
+    if replay.game_over:
+        print('GAME OVER')
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,203 @@
+# Alexander Gottuso 87747555
+
+from collections import namedtuple
+import argparse
+import gc
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+import columns
+import bitboard
+import compact
+import project4
+
+Result = namedtuple('Result', ('name', 'ops', 'peak_kib'))
+
+ENGINES = {'strings': columns.GameState, 'compact': compact.CompactGameState, 'bitboard': bitboard.BitboardGameState}
+SIZES = (columns.Size(6, 3), columns.Size(13, 6), columns.Size(100, 100), columns.Size(1000, 1000))
+DENSITIES = (0.25, 0.75)
+COLORS = 'STVWXYZ'
+
+def random_field(size: columns.Size, density: float, colors: str, seed: int) -> [str]:
+    """
+    Returns the rows of a seeded random board where roughly
+    the given fraction of cells hold one of the given colors.
+    """
+    generator = random.Random(seed)
+    return [''.join(generator.choice(colors) if generator.random() < density else ' '
+        for column in range(size.columns)) for row in range(size.rows)]
+
+def _settled(engine, field: [str]):
+    game = engine(field)
+    game.fall()
+    return game
+
+def _falling(engine, field: [str]):
+    """
+    Returns a game with a faller that has just entered
+    the middle column of the given field.
+    """
+    game = engine([row[:len(row) // 2] + ' ' + row[len(row) // 2 + 1:] if index < 4 else row
+        for index, row in enumerate(field)])
+    game.fall()
+    game.find_matches()
+    game.new_faller(columns.Faller(len(field[0]) // 2, 'XYZ'))
+    return game
+
+def _cascade(game) -> None:
+    """
+    Ticks the given game until no matched cells remain.
+    """
+    while game.find_matches():
+        game.tick()
+
+def _faller_column(engine, field: [str]) -> (columns.Faller, [str]):
+    """
+    Returns the faller of a falling game along
+    with a list copy of the column it is in.
+    """
+    game = _falling(engine, field)
+    return game.faller(), game.field().to_lists()[game.faller().position().column]
+
+def _faller_fall(state: (columns.Faller, [str])) -> None:
+    faller, column = state
+    faller.fall(None, column)
+
+def _move(game) -> None:
+    try:
+        game.move_faller(1)
+    except columns.InvalidMoveError:
+        pass
+
+def _display(game) -> None:
+    project4.FrameWriter(io.StringIO()).write(game)
+
+# each benchmark is a setup building a fresh game from an engine and a
+# field, and the operation that is timed on it; the plain Faller
+# and the frame writer are only timed with the string engine
+BENCHMARKS = {
+    'tick': (_falling, lambda game: game.tick(), ENGINES),
+    'fall': (lambda engine, field: engine(field), lambda game: game.fall(), ENGINES),
+    'find_matches': (_settled, lambda game: game.find_matches(), ENGINES),
+    'move_faller': (_falling, _move, ENGINES),
+    'cascade': (_settled, _cascade, ENGINES),
+    'hard_drop': (_falling, lambda game: game.hard_drop(), ENGINES),
+    'faller_fall': (_faller_column, _faller_fall, ('strings',)),
+    'display_field': (_settled, _display, ('strings',))}
+
+def measure(name: str, setup, operation, min_time: float, repeat: int = 5) -> Result:
+    """
+    Times the operation as timeit does. Each round runs it once on
+    each of a batch of fresh states from setup, all made before the
+    clock starts, and the batch is doubled until a round takes at
+    least min_time / repeat seconds. The fastest of repeat rounds
+    gives the operations per second, since slower ones only measure
+    whatever else the machine was doing. The peak memory of one
+    operation is returned as well.
+    """
+    def time_batch(number: int) -> float:
+        states = [setup() for _ in range(number)]
+        # as in timeit, collections are kept out of the timings
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for state in states:
+                operation(state)
+            return time.perf_counter() - start
+        finally:
+            if collecting:
+                gc.enable()
+
+    number = 1
+    elapsed = time_batch(number)
+    while elapsed < min_time / repeat:
+        number *= 2
+        elapsed = time_batch(number)
+
+    best = min([elapsed] + [time_batch(number) for _ in range(repeat - 1)])
+
+    state = setup()
+    tracemalloc.start()
+    operation(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return Result(name, number / best, peak / 1024)
+
+def run_benchmarks(sizes: [columns.Size], engines: [str], selected: [str], min_time: float, seed: int,
+    repeat: int = 5) -> [Result]:
+    results = []
+    for size in sizes:
+        for density in DENSITIES:
+            field = random_field(size, density, COLORS, seed)
+            # three colors on a full board make long chains of matches
+            cascade_field = random_field(size, 1.0, COLORS[:3], seed)
+
+            for benchmark in selected:
+                setup, operation, allowed = BENCHMARKS[benchmark]
+                board = cascade_field if benchmark == 'cascade' else field
+                if benchmark == 'cascade' and density != DENSITIES[0]:
+                    continue
+
+                for engine in engines:
+                    if engine in allowed:
+                        name = f'{engine}.{benchmark}[{size.rows}x{size.columns}' \
+                            + (']' if benchmark == 'cascade' else f'@{density}]')
+                        result = measure(name, lambda: setup(ENGINES[engine], board), operation, min_time, repeat)
+                        results.append(result)
+                        print(f'{result.name:<44}{result.ops:>14.1f} ops/s{result.peak_kib:>12.1f} KiB', flush=True)
+
+    return results
+
+def compare(results: [Result], baseline: dict, threshold: float) -> [str]:
+    """
+    Returns a description of every result that is slower than
+    its baseline by more than the given fraction.
+    """
+    regressions = []
+    for result in results:
+        if result.name in baseline and result.ops < baseline[result.name]['ops'] * (1 - threshold):
+            regressions.append(f'{result.name}: {result.ops:.1f} ops/s, baseline {baseline[result.name]["ops"]:.1f} ops/s')
+
+    return regressions
+
+def run() -> None:
+    """
+    Runs the benchmarks, optionally saving the results
+    as a baseline or comparing them against one.
+    """
+    parser = argparse.ArgumentParser(description='Benchmarks the Columns engine hot paths.')
+    parser.add_argument('-b', '--benchmark', action='append', choices=BENCHMARKS, help='benchmark to run (default: all)')
+    parser.add_argument('-e', '--engine', action='append', choices=ENGINES, help='engine to run (default: all)')
+    parser.add_argument('--max-size', type=int, default=1000, help='largest number of rows to benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds to spend timing each benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='rounds to take the fastest of (default: 5)')
+    parser.add_argument('--seed', type=int, default=87747555)
+    parser.add_argument('--save', help='write the results to this baseline JSON file')
+    parser.add_argument('--compare', help='compare the results against this baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='slowdown that counts as a regression')
+    arguments = parser.parse_args()
+
+    sizes = [size for size in SIZES if size.rows <= arguments.max_size]
+    results = run_benchmarks(sizes, arguments.engine or list(ENGINES), arguments.benchmark or list(BENCHMARKS),
+        arguments.min_time, arguments.seed, arguments.repeat)
+
+    if arguments.save:
+        with open(arguments.save, 'w') as baseline:
+            json.dump({result.name: result._asdict() for result in results}, baseline, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare) as baseline:
+            regressions = compare(results, json.load(baseline), arguments.threshold)
+
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    run()
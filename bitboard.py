@@ -0,0 +1,317 @@
+# Alexander Gottuso 87747555
+
+from columns import *
+from compact import CompactGameState
+
+# one translation table per code, turning the cells equal
+# to it into '1' and every other cell into '0'
+_BITS = tuple(bytes(ord('1') if cell == code else ord('0') for cell in range(256)) for code in range(256))
+
+_MATCHED_CODES = frozenset(code for code in range(1, 256) if cell_state(code) == MATCHED)
+
+class BitboardGameState(CompactGameState):
+    def __init__(self, field: [str] or Size, full_scan: bool = False):
+        """
+        Builds a new game state that behaves exactly as a
+        CompactGameState, but also keeps the board as one big
+        integer per cell code, with a bit for every cell. The bit
+        of a cell is at column * (rows + 1) + row, so that a bit
+        that is never set follows every column. Matches are found
+        and gravity is applied with shifts and masks over these
+        bitboards, while the bytes are kept for reading single cells.
+        """
+        super().__init__(field, full_scan)
+        self._boards = None
+        self._bitboards()
+
+        # every bit that stands for a cell of the board, and for each
+        # shift used by gravity, the bits that it moves within a column
+        rows = self._size.rows
+        self._stride = rows + 1
+        starts = sum(1 << column * self._stride for column in range(self._size.columns))
+        self._inner = ((1 << rows) - 1) * starts
+        self._within = []
+        step = 1
+        while step < rows:
+            self._within.append(((1 << self._stride - step) - 1) * starts)
+            step <<= 1
+
+    def cells(self) -> bytearray:
+        """
+        Returns the compact board, as CompactGameState.cells()
+        does. It may be changed directly, so the bitboards
+        have to be built from it again.
+        """
+        self._boards = None
+        return super().cells()
+
+    def clone(self) -> 'BitboardGameState':
+        clone = super().clone()
+        clone._boards = None if self._boards == None else dict(self._boards)
+        return clone
+
+    def snapshot(self) -> tuple:
+        """
+        Returns the state of this game as CompactGameState.snapshot()
+        does, followed by the bitboards so that restoring it need
+        not build them again.
+        """
+        return super().snapshot() + (tuple(self._bitboards().items()),)
+
+    def restore(self, snapshot: tuple) -> None:
+        """
+        Returns this game state to the state it was in when the
+        given snapshot was taken, which may also be a snapshot
+        of a CompactGameState of the same size.
+        """
+        super().restore(snapshot[:8])
+        self._boards = dict(snapshot[8]) if len(snapshot) > 8 else None
+
+    def fall(self) -> [int]:
+        """
+        Has every piece fall as far as possible, as
+        CompactGameState.fall() does, compacting the bits of
+        every column toward its bottom all at once. Each piece
+        moves down by as many rows as there are empty cells
+        below it, one bit of that distance at a time.
+        The columns that changed are returned.
+        """
+        if self._instruments != None:
+            self._instruments.start('gravity')
+
+        boards = self._bitboards()
+        rows = self._size.rows
+        stride = self._stride
+        inner = self._inner
+        changed = []
+        moved = 0
+
+        occupied = 0
+        for board in boards.values():
+            occupied |= board
+
+        # a piece falls only if some piece has an empty cell right below it
+        below = (inner & ~occupied) >> 1 & inner
+        if occupied & below:
+            moved_bits = 0
+            distance = 1
+            while distance < rows:
+                # each cell learns whether the number of empty cells
+                # below it is odd, which is the next bit of how far its
+                # piece falls; no shift reaches into the next column
+                parity = below
+                step = 1
+                for within in self._within:
+                    parity ^= parity >> step & within
+                    step <<= 1
+
+                moving = occupied & parity
+                if moving:
+                    moved_bits |= moving
+                    occupied = occupied ^ moving | moving << distance
+                    for code, board in boards.items():
+                        pieces = board & moving
+                        if pieces:
+                            boards[code] = board ^ pieces | pieces << distance
+
+                below &= ~parity
+                distance <<= 1
+
+            # the bytes of the columns that moved are compacted in the
+            # same way, which keeps the order of their pieces just as
+            # moving the bits did
+            cells = self._cells
+            mask = format(moved_bits, 'b')[::-1]
+            position = mask.find('1')
+            while position != -1:
+                column = position // stride
+                base = column * rows
+                pieces = cells[base:base + rows].replace(b'\0', b'')
+                settled = bytes(rows - len(pieces)) + pieces
+                for row in range(rows):
+                    if settled[row] != cells[base + row]:
+                        self._touch(column, row)
+                        moved += 1
+
+                cells[base:base + rows] = settled
+                changed.append(column)
+                self._changed(column)
+                position = mask.find('1', (column + 1) * stride)
+
+        if self._instruments != None:
+            self._instruments.end('gravity')
+            self._instruments.count('cells_moved', moved)
+
+        return changed
+
+    def find_matches(self) -> bool:
+        """
+        Searches the field for match-3+ patterns as
+        CompactGameState.find_matches() does, following
+        every run with shifts of the bitboards. Only runs
+        through cells that changed since the last search
+        are kept, unless the whole board must be searched.
+        """
+        if self._faller != None and not self._can_fit():
+            # the faller sticks out above the board, which only
+            # happens as the game ends, so the bytes are searched
+            found = super().find_matches()
+            self._boards = None
+            return found
+
+        if self._instruments != None:
+            self._instruments.start('match')
+
+        boards = self._bitboards()
+        rows = self._size.rows
+        stride = self._stride
+        steps = (1, stride, stride - 1, stride + 1)
+        marked = 0
+        crossed = 0
+
+        if self._full_scan or self._dirty == None:
+            scanned = len(self._cells)
+            for board in boards.values():
+                for step in steps:
+                    starts = board & board >> step & board >> 2 * step
+                    if starts:
+                        runs = starts | starts << step | starts << 2 * step
+                        crossed |= marked & runs
+                        marked |= runs
+        else:
+            changed = self._dirty.union(self._faller_cells())
+            scanned = len(changed)
+            seeds = 0
+            for column, row in changed:
+                seeds |= 1 << column * stride + row
+
+            for board in boards.values():
+                seeded = board & seeds
+                if not seeded:
+                    continue
+
+                for step in steps:
+                    starts = board & board >> step & board >> 2 * step
+                    if not starts:
+                        continue
+
+                    # runs of one code along one axis never touch,
+                    # so each is followed outward from its seeds
+                    runs = starts | starts << step | starts << 2 * step
+                    found = seeded & runs
+                    while found:
+                        grown = found | (found << step | found >> step) & runs
+                        if grown == found:
+                            break
+                        found = grown
+
+                    crossed |= marked & found
+                    marked |= found
+
+        self._dirty = set()
+        found = marked != 0
+
+        if crossed:
+            # where runs cross, the cells to mark depend on the order
+            # they are found in, so they are followed one at a time
+            cells = self._cells
+            mask = format(marked, 'b')[::-1]
+            matched = []
+            position = mask.find('1')
+            while position != -1:
+                matched.append(Position(*divmod(position, stride)))
+                position = mask.find('1', position + 1)
+
+            marked = 0
+            for column, row in first_runs(lambda column, row: cells[column * rows + row], self._size, matched):
+                marked |= 1 << column * stride + row
+
+        if found:
+            for code in list(boards):
+                hit = boards[code] & marked
+                if hit:
+                    self._replace(code, boards[code] ^ hit)
+                    self._replace(with_state(code, MATCHED), boards.get(with_state(code, MATCHED), 0) | hit)
+
+            # the matched bits are found through one binary string,
+            # since taking them off a big integer one at a time
+            # would go through all of it for each of them
+            mask = format(marked, 'b')[::-1]
+            position = mask.find('1')
+            while position != -1:
+                column, row = divmod(position, stride)
+                self._cells[column * rows + row] = with_state(self._cells[column * rows + row], MATCHED)
+                self._changed(column)
+                position = mask.find('1', position + 1)
+
+            if self._faller != None:
+                base = self._base(self._column)
+                for piece in range(len(self._pieces)):
+                    row = self._row - (len(self._pieces) - 1) + piece
+                    self._pieces[piece] = self._cells[base + (row + rows if row < 0 else row)]
+
+        if self._instruments != None:
+            self._instruments.end('match')
+            self._instruments.count('cells_scanned', scanned)
+            self._instruments.count('matches_found', marked.bit_count())
+
+        return found
+
+    def _cleared(self) -> bytearray or None:
+        # nothing is matched unless a matched code has a bitboard
+        if _MATCHED_CODES.isdisjoint(self._bitboards()):
+            return None
+
+        return super()._cleared()
+
+    def _clear(self, cleared: bytearray, instruments) -> int:
+        boards = self._bitboards()
+        for code in [code for code in boards if code in _MATCHED_CODES]:
+            del boards[code]
+
+        return super()._clear(cleared, instruments)
+
+    def _bitboards(self) -> {int: int}:
+        """
+        Returns the bitboard of every code on the board, building
+        them again from the bytes if those were changed directly.
+        """
+        if self._boards == None:
+            rows = self._size.rows
+            padded = b'\0'.join(self._cells[column * rows:(column + 1) * rows]
+                for column in range(self._size.columns)) + b'\0'
+
+            # the last cell is read first, as the highest bit
+            reverse = padded[::-1]
+            self._boards = {code: int(reverse.translate(_BITS[code]), 2) for code in set(padded) if code != EMPTY}
+
+        return self._boards
+
+    def _replace(self, code: int, board: int) -> None:
+        if board:
+            self._boards[code] = board
+        else:
+            self._boards.pop(code, None)
+
+    def _set(self, index: int, code: int) -> None:
+        """
+        Writes a code into the cell at the given offset of
+        the compact board and into the bitboards with it.
+        """
+        old = self._cells[index]
+        if old == code:
+            return
+
+        self._cells[index] = code
+        boards = self._boards
+        if boards != None:
+            # each column before this cell adds its unset bit
+            bit = 1 << index + index // self._size.rows
+            if old != EMPTY:
+                board = boards[old] ^ bit
+                if board:
+                    boards[old] = board
+                else:
+                    del boards[old]
+            if code != EMPTY:
+                boards[code] = boards.get(code, 0) | bit
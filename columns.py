@@ -1,7 +1,8 @@
 # Alexander Gottuso 87747555
 
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 import copy
+import random
 
 class GameOverError(Exception):
     pass
@@ -12,36 +13,515 @@ class InvalidMoveError(Exception):
 Size = namedtuple('Size', ('rows', 'columns'))
 Position = namedtuple('Position', ('column', 'row'))
 
+# Compact cells are single bytes: the low five bits hold the
+# jewel's color (1-26 for 'A' to 'Z') and the high three
+# bits hold its state. An empty cell is always 0.
+EMPTY = 0
+FALLING = 1
+LANDED = 2
+FROZEN = 3
+MATCHED = 4
+
+# what happened in a tick, as bits of one int
+LANDED_EVENT = 1
+FROZEN_EVENT = 2
+MATCHED_EVENT = 4
+CLEARED_EVENT = 8
+GAME_OVER_EVENT = 16
+
+_COLOR_BITS = 5
+_COLOR_MASK = (1 << _COLOR_BITS) - 1
+_BRACKETS = {FALLING: '[]', LANDED: '||', FROZEN: '  ', MATCHED: '**'}
+
+# color 0 only appears alongside a state when a faller
+# picks up a blank cell, which renders as '[ ]' or '| |'
+_CELL_STRINGS = ['   '] * 256
+_CELL_CODES = {}
+for _state, (_left, _right) in _BRACKETS.items():
+    for _color in range(27):
+        _code = _state << _COLOR_BITS | _color
+        _CELL_STRINGS[_code] = f'{_left}{chr(ord("A") + _color - 1) if _color else " "}{_right}'
+        _CELL_CODES[_CELL_STRINGS[_code]] = _code
+_CELL_CODES['   '] = EMPTY
+_CELL_STRINGS = tuple(_CELL_STRINGS)
+
+def color_code(jewel: str) -> int:
+    """
+    Returns the color code for a single jewel letter,
+    or EMPTY if the given character is a space.
+    """
+    return _CELL_CODES[f' {jewel} '] & _COLOR_MASK
+
+def cell_code(cell: str) -> int:
+    """
+    Returns the compact code for a 3-character cell string.
+    """
+    return _CELL_CODES[cell]
+
+def cell_string(code: int) -> str:
+    """
+    Returns the 3-character cell string for a compact code.
+    """
+    return _CELL_STRINGS[code]
+
+def cell_state(code: int) -> int:
+    return code >> _COLOR_BITS
+
+def with_state(code: int, state: int) -> int:
+    """
+    Returns the given cell code with its state replaced;
+    a frozen blank is the same as an empty cell.
+    """
+    code = state << _COLOR_BITS | code & _COLOR_MASK
+    return EMPTY if code == FROZEN << _COLOR_BITS else code
+
+# one translation table per code, selecting the cells equal to it
+_SELECT = tuple(bytes(1 if code == cell else 0 for cell in range(256)) for code in range(256))
+
+def match_mask(cells: bytes, rows: int, vertical: bool = True) -> bytes:
+    """
+    Given a column-major board of cell codes with the given
+    number of rows, returns a mask in the same layout that
+    is 1 for every cell in a horizontal, vertical or diagonal
+    run of 3+ equal, non-empty cells and 0 everywhere else.
+    Where runs cross, only the cells first_runs() keeps are 1.
+    Vertical runs are left out if vertical is False.
+    """
+    columns = len(cells) // rows
+    stride = rows + 1
+
+    # a blank cell after every column stops runs
+    # from wrapping onto the next one
+    padded = padded_match_mask(b'\0'.join(cells[column * rows:(column + 1) * rows] for column in range(columns)),
+        rows, vertical)
+    if 1 not in padded:
+        return bytes(len(cells))
+
+    return b''.join(padded[column * stride:column * stride + rows] for column in range(columns))
+
+def padded_match_mask(padded: bytes, rows: int, vertical: bool = True) -> bytes:
+    """
+    Returns the same mask as match_mask() for a board that
+    already has an empty cell after each of its columns,
+    in the same layout as that board.
+    """
+    stride = rows + 1
+    marked = 0
+    crossed = 0
+    steps = (8, 8 * stride, 8 * (stride - 1), 8 * (stride + 1)) if vertical else (8 * stride, 8 * (stride - 1), 8 * (stride + 1))
+
+    # each cell becomes one byte of a big integer
+    for code in set(padded) - {EMPTY}:
+        jewels = int.from_bytes(padded.translate(_SELECT[code]), 'little')
+        for step in steps:
+            starts = jewels & jewels >> step & jewels >> 2 * step
+            if starts:
+                runs = starts | starts << step | starts << 2 * step
+                crossed |= marked & runs
+                marked |= runs
+
+    mask = marked.to_bytes(len(padded), 'little')
+    if crossed:
+        mask = _first_runs_mask(padded, stride, mask)
+
+    return mask
+
+def _first_runs_mask(padded: bytes, stride: int, mask: bytes) -> bytes:
+    """
+    Given a board with an empty cell after each of its columns
+    and the mask of every run on it, returns the mask of the
+    cells first_runs() marks, in the same layout.
+    """
+    matched = []
+    index = mask.find(1)
+    while index != -1:
+        matched.append(Position(index // stride, index % stride))
+        index = mask.find(1, index + 1)
+
+    # the last column need not be followed by an empty cell
+    board = padded + bytes(-len(padded) % stride)
+    result = bytearray(len(mask))
+    for column, row in first_runs(lambda column, row: board[column * stride + row],
+        Size(stride, len(board) // stride), matched):
+
+        result[column * stride + row] = 1
+
+    return bytes(result)
+
+def seeded_match_mask(cells: bytes, rows: int, seeds: bytes) -> bytes:
+    """
+    Returns the part of match_mask() made of runs that pass
+    through a cell whose byte in seeds is 1, which is what
+    runs_through() finds from those cells.
+    """
+    columns = len(cells) // rows
+    stride = rows + 1
+    board = b'\0'.join(cells[column * rows:(column + 1) * rows] for column in range(columns))
+    start = int.from_bytes(b'\0'.join(seeds[column * rows:(column + 1) * rows] for column in range(columns)), 'little')
+
+    marked = 0
+    crossed = 0
+    for code in set(board) - {EMPTY}:
+        jewels = int.from_bytes(board.translate(_SELECT[code]), 'little')
+        seeded = start & jewels
+        if not seeded:
+            continue
+
+        for step in (8, 8 * stride, 8 * (stride - 1), 8 * (stride + 1)):
+            starts = jewels & jewels >> step & jewels >> 2 * step
+            if not starts:
+                continue
+
+            # runs of one color along one axis never touch, so each
+            # is followed one cell at a time outward from its seeds
+            runs = starts | starts << step | starts << 2 * step
+            found = seeded & runs
+            while found:
+                grown = found | (found << step | found >> step) & runs
+                if grown == found:
+                    break
+                found = grown
+
+            crossed |= marked & found
+            marked |= found
+
+    if not marked:
+        return bytes(len(cells))
+
+    mask = marked.to_bytes(len(board), 'little')
+    if crossed:
+        mask = _first_runs_mask(board, stride, mask)
+
+    return b''.join(mask[column * stride:column * stride + rows] for column in range(columns))
+
+_AXES = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+def runs_through(cell, empty, size: Size, positions) -> {Position}:
+    """
+    Given a function returning the cell at a column and row,
+    returns every position in a horizontal, vertical or diagonal
+    run of 3+ equal, non-empty cells that passes through
+    one of the given positions. Where runs cross, only the
+    positions first_runs() keeps are returned.
+    """
+    # the axis each position was first found along
+    matched = {}
+    crossed = False
+    for column, row in positions:
+        piece = cell(column, row)
+        if piece == empty:
+            continue
+
+        for axis in _AXES:
+            coldelta, rowdelta = axis
+            run = [Position(column, row)]
+            for direction in range(-1, 2, 2):
+                dist = 1
+                while 0 <= column + coldelta * dist * direction < size.columns \
+                    and 0 <= row + rowdelta * dist * direction < size.rows \
+                    and cell(column + coldelta * dist * direction, row + rowdelta * dist * direction) == piece:
+
+                    run.append(Position(column + coldelta * dist * direction, row + rowdelta * dist * direction))
+                    dist += 1
+
+            if len(run) >= 3:
+                for position in run:
+                    if matched.setdefault(position, axis) != axis:
+                        crossed = True
+
+    if crossed:
+        return first_runs(cell, size, matched)
+
+    return set(matched)
+
+# the directions the original scan tried from each cell, in its order
+_DIRECTIONS = tuple((coldelta, rowdelta) for coldelta in range(-1, 2) for rowdelta in range(-1, 2)
+    if coldelta != 0 or rowdelta != 0)
+
+def first_runs(cell, size: Size, matched) -> {Position}:
+    """
+    Given a function returning the cell at a column and row, and
+    every position in a run of 3+ on that board, returns the ones
+    the original scan marks. Visiting cells column by column, it
+    marks the first run it finds going away from each cell not yet
+    marked, and compares only with cells it has not marked. Where
+    runs cross, the shared cell goes to the run found first, and
+    what is left of the others is only marked if 3+ cells long.
+    """
+    marked = set()
+    for column, row in sorted(matched):
+        if (column, row) in marked:
+            continue
+
+        piece = cell(column, row)
+        for coldelta, rowdelta in _DIRECTIONS:
+            for dist in range(1, 3):
+                if not (0 <= column + coldelta * dist < size.columns and 0 <= row + rowdelta * dist < size.rows) \
+                    or cell(column + coldelta * dist, row + rowdelta * dist) != piece \
+                    or (column + coldelta * dist, row + rowdelta * dist) in marked:
+
+                    break
+            else:
+                marked.add(Position(column, row))
+                for direction in range(-1, 2, 2):
+                    dist = 1
+                    while 0 <= column + coldelta * dist * direction < size.columns \
+                        and 0 <= row + rowdelta * dist * direction < size.rows \
+                        and cell(column + coldelta * dist * direction, row + rowdelta * dist * direction) == piece \
+                        and (column + coldelta * dist * direction, row + rowdelta * dist * direction) not in marked:
+
+                        marked.add(Position(column + coldelta * dist * direction, row + rowdelta * dist * direction))
+                        dist += 1
+                break
+
+    return marked
+
+ColumnEntry = namedtuple('ColumnEntry', ('settled', 'moved', 'codes', 'runs'))
+
+def _column_entry(cells: tuple) -> ColumnEntry:
+    """
+    Given the cells of a column, returns them after gravity
+    along with the rows gravity changed, as compact cell codes,
+    and as a mask of vertical runs.
+    """
+    pieces = tuple(cell for cell in cells if cell != '   ')
+    settled = ('   ',) * (len(cells) - len(pieces)) + pieces
+    runs = bytearray(len(cells))
+
+    start = 0
+    for row in range(1, len(cells) + 1):
+        if row == len(cells) or cells[row] != cells[start]:
+            if row - start >= 3 and cells[start] != '   ':
+                runs[start:row] = bytes([1]) * (row - start)
+            start = row
+
+    return ColumnEntry(settled, tuple(row for row in range(len(cells)) if settled[row] != cells[row]),
+        bytes(_CELL_CODES[cell] for cell in cells), bytes(runs))
+
+class ColumnCache:
+    def __init__(self, max_size: int = 4096):
+        """
+        Remembers what gravity and vertical matching make of each
+        column's contents, for any number of game states to share.
+        Once it holds max_size columns, the least recently used
+        one is forgotten.
+        """
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, cells: tuple) -> ColumnEntry:
+        """
+        Given the cells of a column as a tuple,
+        returns its entry, making it if needed.
+        """
+        entry = self._entries.get(cells)
+        if entry != None:
+            self._hits += 1
+            self._entries.move_to_end(cells)
+            return entry
+
+        self._misses += 1
+        entry = self._entries[cells] = _column_entry(cells)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last = False)
+
+        return entry
+
+    def hits(self) -> int:
+        return self._hits
+
+    def misses(self) -> int:
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+
+class ZobristKeys:
+    def __init__(self, size: Size, seed: int = 87747555):
+        """
+        Seeded random keys for every cell of a board of the
+        given size holding each compact cell code. A board's hash
+        is the XOR of the keys of all its non-empty cells, and
+        is the same in every process for the same seed.
+        """
+        generator = random.Random(seed)
+        self._size = size
+        self._cells = [generator.getrandbits(64) for cell in range(size.rows * size.columns)]
+        # one key per cell and per code would be too many for large
+        # boards, so each key is the high half of their product
+        self._codes = [0] + [generator.getrandbits(64) | 1 for code in range(1, 256)]
+
+    def size(self) -> Size:
+        return self._size
+
+    def key(self, column: int, row: int, code: int) -> int:
+        return self._cells[column * self._size.rows + row] * self._codes[code] >> 64
+
+    def hash_column(self, column: int, codes) -> int:
+        """
+        Returns the hash of one column given as compact cell codes.
+        """
+        base = column * self._size.rows
+        result = 0
+        for row in range(len(codes)):
+            if codes[row] != EMPTY:
+                result ^= self._cells[base + row] * self._codes[codes[row]] >> 64
+
+        return result
+
+    def hash_field(self, field: [[str]]) -> int:
+        """
+        Returns the hash of a board given as lists of columns.
+        """
+        result = 0
+        for column in range(len(field)):
+            result ^= self.hash_column(column, [_CELL_CODES[cell] for cell in field[column]])
+
+        return result
+
+    def hash_faller(self, state: tuple) -> int:
+        """
+        Returns the hash of a faller's column, row, status
+        and piece codes, or 0 for an empty tuple.
+        """
+        return hash(state) & 0xFFFFFFFFFFFFFFFF if state else 0
+
+_zobrist_keys = {}
+
+def zobrist_keys(size: Size) -> ZobristKeys:
+    """
+    Returns the keys used for the hashes of every game
+    state of the given size, making them only once.
+    """
+    keys = _zobrist_keys.get(size)
+    if keys == None:
+        keys = _zobrist_keys[size] = ZobristKeys(size)
+
+    return keys
+
+class FieldView:
+    def __init__(self, size: Size, column, cell):
+        """
+        A read-only view of a board of the given size, given
+        a function returning the cells of one of its columns
+        as 3-character strings and one returning a single cell
+        from its column and row. Nothing is made until it is
+        looked at, so the view always shows the board as it is.
+        """
+        self._size = size
+        self._column = column
+        self._cell = cell
+
+    def size(self) -> Size:
+        return self._size
+
+    def __len__(self) -> int:
+        return self._size.columns
+
+    def __getitem__(self, column: int) -> (str,):
+        """
+        Returns the cells of the given column from top to bottom,
+        allowing negative columns as list indexing would.
+        """
+        if not -self._size.columns <= column < self._size.columns:
+            raise IndexError('column index out of range')
+
+        return tuple(self._column(column % self._size.columns))
+
+    def __iter__(self):
+        for column in range(self._size.columns):
+            yield tuple(self._column(column))
+
+    def __eq__(self, other) -> bool:
+        if type(other) != FieldView:
+            return NotImplemented
+
+        return self._size == other._size and all(mine == theirs for mine, theirs in zip(self, other))
+
+    def cell(self, column: int, row: int) -> str:
+        """
+        Returns one cell without making its column,
+        allowing negative indexes as list indexing would.
+        """
+        if not -self._size.columns <= column < self._size.columns:
+            raise IndexError('column index out of range')
+
+        return self._cell(column % self._size.columns, self._row_index(row))
+
+    def column(self, column: int) -> (str,):
+        return self[column]
+
+    def row(self, row: int) -> (str,):
+        row = self._row_index(row)
+        return tuple(self._cell(column, row) for column in range(self._size.columns))
+
+    def rows(self) -> [(str,)]:
+        return list(zip(*self))
+
+    def render(self) -> str:
+        """
+        Returns the frame that shows this board,
+        one row per line above a line of dashes.
+        """
+        columns = [self._column(column) for column in range(self._size.columns)]
+        lines = ['|' + ''.join(cells) + '|\n' for cells in zip(*columns)]
+        lines.append(' ' + '-' * 3 * self._size.columns + ' \n')
+        return ''.join(lines)
+
+    def to_lists(self) -> [[str]]:
+        """
+        Returns a copy of the board as a list of columns,
+        each a list of cells, which may be changed freely.
+        """
+        return [list(self._column(column)) for column in range(self._size.columns)]
+
+    def _row_index(self, row: int) -> int:
+        if not -self._size.rows <= row < self._size.rows:
+            raise IndexError('row index out of range')
+
+        return row % self._size.rows
+
 class Faller:
+    __slots__ = ('_column', '_row', '_colors', '_offset', '_count', '_state', '_matched')
+
     def __init__(self, column: int, pieces: str):
         """
         Given a string representing three pieces,
         creates a new Faller which can drop into
         the given column number.
         """
-        self._pieces = []
-        for piece in list(pieces):
-            self._pieces.append(f'[{piece}]')
+        # the pieces' colors are a ring starting at _offset, so rotating
+        # never rebuilds them, and _matched has one bit per slot
+        self._colors = bytearray(color_code(piece) for piece in pieces)
+        self._offset = 0
+        self._count = len(self._colors)
+        self._matched = 0
+        self._state = FALLING
 
-        self._head = self._pieces[-1]
-        self._position = Position(column, -1)
-        self._landed = False
-        self._frozen = False
+        self._column = column
+        self._row = -1
 
     def pieces(self) -> [str]:
-        return self._pieces
+        return [_CELL_STRINGS[self._code(piece)] for piece in range(self._count)]
 
     def head(self) -> str:
         """
         Returns the bottom piece of this faller.
         """
-        return self._head
+        return _CELL_STRINGS[self._code(self._count - 1)] if self._count > 0 else '   '
 
     def landed(self) -> bool:
-        return self._landed
+        return self._state == LANDED
 
     def frozen(self) -> bool:
-        return self._frozen
+        return self._state == FROZEN
 
     def position(self) -> Position:
         """
@@ -50,16 +530,16 @@ class Faller:
         A negative row indicates the faller is waiting
         off-screen, but should never be less than -1.
         """
-        return self._position
+        return Position(self._column, self._row)
 
     def change_column(self, column: [str]) -> None:
         """
         Changes the given column to reflect
         this faller's position in that column.
         """
-        for piece in range(len(self._pieces)):
-            if self._position.row - piece >= 0:
-                column[self._position.row - piece] = self._pieces[-piece - 1]
+        for piece in range(self._count):
+            if self._row - piece >= 0:
+                column[self._row - piece] = _CELL_STRINGS[self._code(self._count - 1 - piece)]
 
     def rotate(self, column: [str]) -> None:
         """
@@ -67,13 +547,8 @@ class Faller:
         that was once on the bottom is now on top,
         and the other two pieces shift down.
         """
-        result = []
-
-        for piece in range(len(self._pieces)):
-            result.append(self._pieces[piece - 1])
-        else:
-            self._pieces = result
-            self._head = result[-1]
+        if self._count > 0:
+            self._offset = (self._offset - 1) % self._count
             self.change_column(column)
 
     def can_fit(self) -> bool:
@@ -81,7 +556,7 @@ class Faller:
         Returns True if the faller can fit fully
         on the field, and otherwise False.
         """
-        return not ((self._landed or self._frozen) and self._position.row < len(self._pieces) - 1)
+        return not (self._state != FALLING and self._row < self._count - 1)
 
     def check_landing(self, column: [str]) -> None:
         """
@@ -90,21 +565,21 @@ class Faller:
         Returns a GameOverError if the
         faller doesn't fit on the field.
         """
-        changed = self._landed
-        if self._position.row == len(column) - 1 \
-            or column[self._position.row + 1].strip().isalpha():
+        if self._state == FROZEN:
+            # a frozen faller stays frozen wherever it is moved
+            return
 
-            for piece in range(len(self._pieces)):
-                self._pieces[piece] = f'|{self._pieces[piece][1]}|'
-            else:
-                self._landed = True
+        changed = self._state == LANDED
+        self._matched = 0
+
+        if self._row == len(column) - 1 \
+            or column[self._row + 1].strip().isalpha():
+
+            self._state = LANDED
         else:
-            for piece in range(len(self._pieces)):
-                self._pieces[piece] = f'[{self._pieces[piece][1]}]'
-            else:
-                self._landed = False
+            self._state = FALLING
 
-        if self._landed != changed:
+        if (self._state == LANDED) != changed:
             self.change_column(column)
 
     def fall(self, amount: int or None, column: [str]) -> None:
@@ -114,24 +589,15 @@ class Faller:
         given is None, and otherwise fall as much as the amount 
         will allow. Changes the given column to represent this change.
         """
-        def check_below(self, max: int, column: [str]) -> None:
-            """
-            Ensures that the faller can fall and that
-            each index that should be changed is not out of range.
-            Changes the original column that is given.
-            """
-            for cell in range(self._position.row + 1, max):
-                if column[cell] == '   ':
-                    self._position = Position(self._position.column, cell)
-                    self.change_column(column)
-
-                    if cell - len(self._pieces) >= 0:
-                        column[cell - len(self._pieces)] = '   '
-
-        if amount == None:
-            check_below(self, len(column), column)
-        else:
-            check_below(self, self._position.row + amount + 1, column)
+        stop = len(column) if amount == None else min(self._row + amount + 1, len(column))
+
+        for cell in range(self._row + 1, stop):
+            if column[cell] == '   ':
+                self._row = cell
+                self.change_column(column)
+
+                if cell - self._count >= 0:
+                    column[cell - self._count] = '   '
 
         self.check_landing(column)
 
@@ -141,38 +607,95 @@ class Faller:
         popping matches if any are found, or
         freezing pieces that are landed.
         """
-        pieces_copy = copy.copy(self._pieces)
-        full_match = True
-        for piece in pieces_copy:
-            if '*' in piece:
-                self._pieces.remove(piece)
-            else:
-                full_match = False
-        else:
-            if full_match:
-                pass
-            elif '*' in pieces_copy[-1]:
-                self._position = Position(self._position.column, self._position.row - (len(pieces_copy) - len(self._pieces)))
+        if self._matched:
+            count = self._count
+            last_matched = self._is_matched(count - 1)
+            remaining = bytes(self._colors[(self._offset + piece) % count]
+                for piece in range(count) if not self._is_matched(piece))
 
-        for piece in range(len(self._pieces)):
-            if '|' in self._pieces[piece]:
-                self._pieces[piece] = f' {self._pieces[piece][1]} '
-            else:
-                break
+            self._colors[:len(remaining)] = remaining
+            self._offset = 0
+            self._count = len(remaining)
+            self._matched = 0
+
+            if remaining and last_matched:
+                self._row -= count - len(remaining)
+
+        if self._count == 0 or self._state == LANDED:
+            self._state = FROZEN
+
+    def __copy__(self) -> 'Faller':
+        faller = Faller.__new__(Faller)
+        for slot in Faller.__slots__:
+            setattr(faller, slot, getattr(self, slot))
+
+        faller._colors = bytearray(self._colors)
+        return faller
+
+    def _code(self, piece: int) -> int:
+        """
+        Returns the compact cell code of a piece,
+        counting from the top of this faller.
+        """
+        slot = (self._offset + piece) % self._count
+        if self._matched >> slot & 1:
+            return MATCHED << _COLOR_BITS | self._colors[slot]
+
+        return with_state(self._colors[slot], self._state)
+
+    def _is_matched(self, piece: int) -> bool:
+        return self._matched >> (self._offset + piece) % self._count & 1 == 1
+
+    def _set_piece(self, piece: int, cell: str) -> None:
+        """
+        Replaces a piece, counting from the top of this faller,
+        with the jewel in the given cell, marking it as matched
+        if that cell is. Its state otherwise follows this faller.
+        """
+        code = _CELL_CODES[cell]
+        slot = (self._offset + piece) % self._count
+        self._colors[slot] = code & _COLOR_MASK
+
+        if cell_state(code) == MATCHED:
+            self._matched |= 1 << slot
         else:
-            self._frozen = True
-            self._landed = False
+            self._matched &= ~(1 << slot)
 
 class GameState:
-    def __init__(self, field: [str] or Size):
+    def __init__(self, field: [str] or Size, full_scan: bool = False, column_cache: ColumnCache = None):
         """
         Builds a new game state that is empty if the given board
         only specifies size in rows and columns, 
         otherwise reads a list of strings representing rows
         to create the given game state.
+        If full_scan is True, every search for matches looks
+        at the whole board rather than only at changed cells.
+        If a column_cache is given, gravity and searches of the
+        whole board look up each column's contents in it.
         """
         self._field = []
         self._faller = None
+        self._full_scan = full_scan
+        self._column_cache = column_cache
+        self._instruments = None
+        self._recorder = None
+
+        # cells changed since matches were last searched for,
+        # or None if the whole board has to be searched
+        self._dirty = None
+
+        # cells marked by find_matches() and not yet cleared,
+        # or None if the whole board may hold matched jewels
+        self._marked = set()
+
+        # columns whose lists are shared with clones or snapshots,
+        # which are copied before this game state changes them
+        self._shared = set()
+
+        # the hash of each column, or None until a hash is first
+        # asked for, and the columns changed since it last was
+        self._hashes = None
+        self._stale = set()
 
         if type(field) == Size:
             self._size = field
@@ -192,82 +715,273 @@ class GameState:
     def size(self) -> Size:
         return self._size
 
-    def field(self) -> [[str]]:
-        return self._field
+    def field(self) -> FieldView:
+        """
+        Returns a read-only view of the board.
+        """
+        return FieldView(self._size, lambda column: self._field[column], lambda column, row: self._field[column][row])
 
     def faller(self) -> Faller:
         return self._faller
 
-    def tick(self) -> None or GameOverError:
+    def clone(self) -> 'GameState':
+        """
+        Returns an independent copy of this game state.
+        Its columns are shared with this one until
+        either game state changes them.
+        """
+        clone = copy.copy(self)
+        clone._field = self._field[:]
+        clone._faller = copy.copy(self._faller)
+        clone._dirty = None if self._dirty == None else set(self._dirty)
+        clone._marked = None if self._marked == None else set(self._marked)
+        clone._hashes = None if self._hashes == None else self._hashes[:]
+        clone._stale = set(self._stale)
+        clone._recorder = None
+
+        self._shared = set(range(self._size.columns))
+        clone._shared = set(self._shared)
+        return clone
+
+    def snapshot(self) -> tuple:
+        """
+        Returns the current state of this game, which can be
+        given back to restore() any number of times.
+        Like clone(), it shares columns rather than copying them.
+        """
+        self._shared = set(range(self._size.columns))
+        return (tuple(self._field), copy.copy(self._faller),
+            None if self._dirty == None else frozenset(self._dirty),
+            None if self._hashes == None else tuple(self._column_hashes()),
+            None if self._marked == None else frozenset(self._marked))
+
+    def restore(self, snapshot: tuple) -> None:
+        """
+        Returns this game state to the state it was in
+        when the given snapshot was taken. A snapshot without
+        its last part, the marked cells, may be given as well.
+        """
+        field, faller, dirty, hashes = snapshot[:4]
+        marked = snapshot[4] if len(snapshot) > 4 else None
+        self._marked = None if marked == None else set(marked)
+        self._hashes = None if hashes == None else list(hashes)
+        self._stale = set()
+        self._field = list(field)
+        self._faller = copy.copy(faller)
+        self._dirty = None if dirty == None else set(dirty)
+        self._shared = set(range(self._size.columns))
+
+        if self._recorder != None:
+            self._recorder.restore(self)
+
+    def state_hash(self) -> int:
+        """
+        Returns a Zobrist hash of the board and the current faller,
+        which is the same for equal game states of either engine.
+        Only the columns changed since the last hash are hashed again.
+        """
+        result = zobrist_keys(self._size).hash_faller(self._faller_state())
+        for column_hash in self._column_hashes():
+            result ^= column_hash
+
+        return result
+
+    def __eq__(self, other) -> bool:
+        """
+        Game states are equal when their boards and fallers are,
+        which is only compared in full when their hashes match.
+        """
+        if type(other) != type(self):
+            return NotImplemented
+
+        return self.state_hash() == other.state_hash() and self._size == other._size \
+            and self._field == other._field and self._faller_state() == other._faller_state()
+
+    def instrument(self, instruments) -> None:
+        """
+        Attaches an instruments.Instruments to this game state,
+        or detaches it if None is given. While attached, it is
+        told when each phase of the engine starts and ends.
+        """
+        self._instruments = instruments
+
+    def record(self, recorder) -> None:
+        """
+        Attaches a gamelog.GameLogWriter to this game state,
+        or detaches it if None is given. While attached, it is
+        told of every tick, every change to the faller
+        and every restore(). Clones are never attached.
+        """
+        self._recorder = recorder
+
+    def tick(self) -> int or GameOverError:
         """
         Changes the board to reflect the passage of time,
         freezing the current faller if it has landed,
         causing the current faller to fall by 1 row, or
         causing matches to disappear. If the current faller
         cannot fit and no matches are found through it,
-        then a GameOverError is returned.
+        then a GameOverError is returned. Otherwise returns
+        what happened as *_EVENT bits.
         """
+        instruments = self._instruments
+        try:
+            if instruments != None:
+                instruments.start('tick')
+                try:
+                    return self._tick(instruments)
+                finally:
+                    instruments.end('tick')
+            else:
+                return self._tick(None)
+        finally:
+            # a tick that ends the game is still recorded
+            if self._recorder != None:
+                self._recorder.tick(self)
+
+    def _tick(self, instruments) -> int or GameOverError:
+        if instruments != None:
+            instruments.start('clear')
+
         fall = False
-        for column in range(len(self._field)):
-            for row in range(len(self._field[column])):
-                if '*' in self._field[column][row]:
-                    fall = True
-                    self._field[column][row] = '   '
-        else:
-            if fall:
-                if type(self._faller) == Faller:
-                    self._faller.tick() # removes matched pieces
-                    self._faller.fall(None, self._field[self._faller.position().column])
-                    self._faller.tick() # freezes remaining pieces
-                    self._faller.change_column(self._field[self._faller.position().column])
+        marked = self._marked_cells()
+        for column, row in marked:
+            if '*' in self._field[column][row]:
+                fall = True
+                self._own(column)[row] = '   '
+
+        self._marked = set()
+
+        if instruments != None:
+            instruments.end('clear')
+            instruments.count('cells_scanned', len(marked))
 
-                self.fall()
-                return
+        if fall:
+            if instruments != None:
+                instruments.count('cascades')
+
+            if type(self._faller) == Faller:
+                if instruments != None:
+                    instruments.start('faller')
+
+                self._faller.tick() # removes matched pieces
+                self._faller.fall(None, self._own(self._faller.position().column))
+                self._faller.tick() # freezes remaining pieces
+                self._faller.change_column(self._own(self._faller.position().column))
+                self._touch_faller()
+
+                if instruments != None:
+                    instruments.end('faller')
+
+            self.fall()
+            return CLEARED_EVENT
 
         if self._faller == None:
-            self.find_matches()
+            return MATCHED_EVENT if self.find_matches() else 0
         elif type(self._faller) == Faller:
             if self._faller.landed():
+                if instruments != None:
+                    instruments.start('freeze')
+
                 self._faller.tick()
-                self._faller.change_column(self._field[self._faller.position().column])
+                self._faller.change_column(self._own(self._faller.position().column))
+                self._touch_faller()
+
+                if instruments != None:
+                    instruments.end('freeze')
+
+                return FROZEN_EVENT
             elif self._faller.frozen():
-                if not self.find_matches() and not self._faller.can_fit():
+                if self.find_matches():
+                    return MATCHED_EVENT
+                elif not self._faller.can_fit():
                     raise GameOverError
             else:
-                self._faller.fall(1, self._field[self._faller.position().column])
+                if instruments != None:
+                    instruments.start('faller')
 
-    def fall(self) -> None:
+                self._faller.fall(1, self._own(self._faller.position().column))
+                self._touch_faller()
+
+                if instruments != None:
+                    instruments.end('faller')
+
+                return LANDED_EVENT if self._faller.landed() else 0
+
+        return 0
+
+    def fall(self) -> [int]:
         """
         Changes the board of this game state to
         reflect what happens after all pieces fall
         as far as possible, as long as
         nothing is blocking their way.
+        Pieces keep their order within each column,
+        and the columns that changed are returned.
         """
+        if self._instruments != None:
+            self._instruments.start('gravity')
+
+        changed = []
+        moved = 0
         for column in range(self._size.columns):
-            for row in range(self._size.rows):
-                if self._field[column][row] != '   ':
-                    for cell in range(1, self._size.rows - row):
-                        if self._field[column][-cell] == '   ':
-                            self._field[column][-cell] = self._field[column][row]
-                            self._field[column][row] = '   '
+            if self._column_cache != None:
+                entry = self._column_cache.get(tuple(self._field[column]))
+                settled, rows = entry.settled, entry.moved
+            else:
+                pieces = [cell for cell in self._field[column] if cell != '   ']
+                settled = ['   '] * (self._size.rows - len(pieces)) + pieces
+                rows = [row for row in range(self._size.rows) if settled[row] != self._field[column][row]]
+
+            if rows:
+                for row in rows:
+                    self._touch(column, row, settled[row][0] == '*')
+                moved += len(rows)
+
+                self._own(column)[:] = settled
+                changed.append(column)
+
+        if self._instruments != None:
+            self._instruments.end('gravity')
+            self._instruments.count('cells_moved', moved)
+
+        return changed
 
     def new_faller(self, faller: Faller) -> None:
         """
         Given a faller, changes the board to show the head
         of a new Faller which is based on that string.
         """
+        if not -self._size.columns <= faller.position().column < self._size.columns:
+            raise IndexError('column index out of range')
+
+        self._touch_faller()
+
+        if self._recorder != None:
+            self._recorder.new_faller(faller)
+
         self._faller = faller
         if self._field[self._faller.position().column][0].strip().isalpha():
             raise GameOverError
         else:
-            self._faller.fall(1, self._field[self._faller.position().column])
+            self._faller.fall(1, self._own(self._faller.position().column))
+            self._touch_faller()
 
     def move_faller(self, direction: int) -> None:
         """
         Given a direction, where -1 is left and 1 is right,
         change the board so that the current faller is moved over
-        once in that direction.
+        once in that direction. Raises InvalidMoveError if the
+        faller is blocked or would leave the board.
         """
+        # a blocked move may already have moved some pieces,
+        # so it is recorded whether it succeeds or not
+        if self._recorder != None and type(self._faller) == Faller:
+            self._recorder.move(direction)
+
+        if not 0 <= self._faller.position().column + direction < self._size.columns:
+            raise InvalidMoveError
+
         for row in range(len(self._faller.pieces())):
             try:
                 if self._field[self._faller.position().column + direction][self._faller.position().row - row] != '   ':
@@ -276,89 +990,263 @@ class GameState:
                 pass
             else:
                 try:
-                    self._field[self._faller.position().column + direction][self._faller.position().row - row] = self._faller.pieces()[-row - 1]
-                    self._field[self._faller.position().column][self._faller.position().row - row] = '   '
+                    self._own(self._faller.position().column + direction)[self._faller.position().row - row] = self._faller.pieces()[-row - 1]
+                    self._own(self._faller.position().column)[self._faller.position().row - row] = '   '
+                    self._touch(self._faller.position().column + direction, self._faller.position().row - row, True)
                 except IndexError:
                     pass
         else:
-            self._faller._position = Position(self._faller.position().column + direction, self._faller.position().row)
-            self._faller.check_landing(self._field[self._faller.position().column])
+            self._faller._column += direction
+            self._faller.check_landing(self._own(self._faller.position().column))
+
+    def rotate_faller(self) -> None:
+        """
+        Rotates the current faller so that its bottom
+        piece is on top, changing the board to match.
+        """
+        if type(self._faller) == Faller:
+            self._faller.rotate(self._own(self._faller.position().column))
+            self._touch_faller()
+
+            if self._recorder != None:
+                self._recorder.rotate()
+
+    def hard_drop(self, resolve: bool = False) -> [int]:
+        """
+        Drops a falling faller straight onto whatever is below it,
+        ending where ticking it would but writing its column only
+        once, and returns its events as tick() would. If resolve
+        is True, the game is then ticked until the faller is
+        frozen and no matches are left, and the events of every
+        one of those ticks follow.
+        """
+        events = []
+        faller = self._faller
+        if type(faller) == Faller and faller._state == FALLING:
+            if self._recorder != None:
+                self._recorder.drop()
+            if self._instruments != None:
+                self._instruments.start('drop')
+
+            column = self._own(faller.position().column)
+            row = faller.position().row
+            landing = row + 1
+            while landing < len(column) and column[landing] == '   ':
+                landing += 1
+
+            # the faller only covers its old cells again
+            # if it could not fall at all
+            for piece in range(faller._count):
+                if row - piece >= 0:
+                    column[row - piece] = '   '
+
+            faller._row = landing - 1
+            faller.change_column(column)
+            faller.check_landing(column)
+            self._touch_faller()
+            events.append(LANDED_EVENT if faller.landed() else 0)
+
+            if self._instruments != None:
+                self._instruments.end('drop')
+
+        if resolve:
+            while True:
+                events.append(self.tick())
+                if events[-1] == 0 and (type(self._faller) != Faller or self._faller.frozen()):
+                    break
+
+        return events
+
+    def resolve(self) -> [int]:
+        """
+        Ticks a game whose faller, if any, has frozen until
+        no matches are left, returning the number of jewels
+        cleared by each step of the chain. Nothing is done
+        while the faller is still moving.
+        """
+        chain = []
+        if type(self._faller) == Faller and not self._faller.frozen():
+            return chain
+
+        while True:
+            matched = self._matched()
+            if matched == 0:
+                if not self.tick() & MATCHED_EVENT:
+                    return chain
+                matched = self._matched()
+
+            self.tick()
+            chain.append(matched)
 
     def find_matches(self) -> bool:
         """
         Searches the field for match-3+ patterns;
         if any match is found, the board is changed 
         to reflect all matches and True is returned.
+        Only runs through cells that changed since the last
+        search are looked for, unless the whole board must be.
         """
-        found = False
-        field_copy = copy.deepcopy(self._field)
+        if self._instruments != None:
+            self._instruments.start('match')
+
+        field = self._field
         off_rows = 0
 
         if type(self._faller) == Faller and not self._faller.can_fit():
             off_rows = 2 - self._faller.position().row
             off_pieces = (-1, -2, -3)
+            field = [column[:] for column in self._field]
             for piece in range(off_pieces[self._faller.position().row + 1], -4, -1):
-                for column in range(len(field_copy)):
-                    if column == self._faller.position().column:
-                        field_copy[column].insert(0, self._faller.pieces()[piece])
+                for column in range(len(field)):
+                    if column == self._faller.position().column % self._size.columns:
+                        field[column].insert(0, self._faller.pieces()[piece])
                     else:
-                        field_copy[column].insert(0, '   ')
-
-        def find_match(self, position: Position) -> bool:
-            """
-            Marks all pieces in a match if a match-3+ is found by 
-            extending in all directions from a specified position.
-            Returns True if a match is found, and otherwise false.
-            """
-            for coldelta in range(-1, 2):
-                for rowdelta in range(-1, 2):
-                    if coldelta == 0 and rowdelta == 0:
-                        continue
-
-                    piece = field_copy[position.column][position.row]
-                    if piece == '   ':
-                        return False
-
-                    for cell in range(1, 3):
-                        try:
-                            if field_copy[position.column + coldelta * cell][position.row + rowdelta * cell] != piece\
-                                or (position.column + coldelta * cell < 0 or position.row + rowdelta * cell < 0):
-
-                                break
-                        except IndexError:
-                            break
-                    else:
-                        field_copy[position.column][position.row] = f"*{piece.strip('*').strip()}*"
-
-                        for direction in range(-1, 2, 2):
-                            dist = 1
-                            try:
-                                while field_copy[position.column + coldelta * dist * direction][position.row + rowdelta * dist * direction] == piece:
-                                    if position.column + coldelta * dist * direction < 0 or position.row + rowdelta * dist * direction < 0:
-                                        break
-
-                                    field_copy[position.column + coldelta * dist * direction][position.row + rowdelta * dist * direction] =\
-                                        f"*{field_copy[position.column + coldelta * dist * direction][position.row + rowdelta * dist * direction].strip('*').strip()}*"
-                                    dist += 1
-                            except IndexError:
-                                continue
-                        else:
-                            return True
+                        field[column].insert(0, '   ')
+
+        if self._full_scan or self._dirty == None or off_rows > 0:
+            height = self._size.rows + off_rows
+            if self._column_cache != None:
+                entries = [self._column_cache.get(tuple(column)) for column in field]
+                codes = b''.join(entry.codes for entry in entries)
+                mask = match_mask(codes, height, vertical = False)
+                runs = b''.join(entry.runs for entry in entries)
+                if 1 in runs:
+                    # vertical runs only need searching again if
+                    # they may cross one of the other runs
+                    mask = match_mask(codes, height) if 1 in mask else runs
             else:
-                return False
+                mask = match_mask(bytes(_CELL_CODES[cell] for column in field for cell in column), height)
+
+            scanned = height * self._size.columns
+            matched = []
+            index = mask.find(1)
+            while index != -1:
+                matched.append(Position(index // height, index % height))
+                index = mask.find(1, index + 1)
+        else:
+            changed = self._dirty.union(self._faller_cells())
+            scanned = len(changed)
+            matched = runs_through(lambda column, row: field[column][row], '   ', self._size, changed)
+
+        for column, row in matched:
+            cells = field[column] if off_rows > 0 else self._own(column)
+            cells[row] = _CELL_STRINGS[with_state(_CELL_CODES[cells[row]], MATCHED)]
+            if self._marked != None and row >= off_rows:
+                self._marked.add(Position(column, row - off_rows))
+
+        found = len(matched) > 0
+        self._dirty = set()
 
-        for column in range(len(field_copy)):
-            for row in range(len(field_copy[column])):
-                if find_match(self, Position(column, row)):
-                    found = True
-        
         if found:
-            for column in range(self._size.columns):
-                self._field[column] = field_copy[column][off_rows:]
+            if off_rows > 0:
+                for column in range(self._size.columns):
+                    self._own(column)[:] = field[column][off_rows:]
             
             if type(self._faller) == Faller:
                 for piece in range(len(self._faller.pieces())):
-                    self._faller.pieces()[piece] = field_copy[self._faller.position().column]\
-                        [piece if off_rows > 0 else self._faller.position().row - (len(self._faller.pieces()) - 1) + piece]
+                    self._faller._set_piece(piece, field[self._faller.position().column]\
+                        [piece if off_rows > 0 else self._faller.position().row - (len(self._faller.pieces()) - 1) + piece])
+
+        if self._instruments != None:
+            self._instruments.end('match')
+            self._instruments.count('cells_scanned', scanned)
+            self._instruments.count('matches_found', len(matched))
+
+        return found
+
+    def _matched(self) -> int:
+        """
+        Returns the number of matched jewels, counting
+        any matched pieces of the faller above the board.
+        """
+        count = sum(self._field[column][row][0] == '*' for column, row in self._marked_cells())
+        if type(self._faller) == Faller:
+            top = self._faller._row - self._faller._count + 1
+            count += sum(self._faller._is_matched(piece) for piece in range(min(-top, self._faller._count)))
+
+        return count
+
+    def _marked_cells(self) -> [Position]:
+        """
+        Returns the cells that may hold matched jewels: those
+        find_matches() marked, those a faller has written and
+        those that matched jewels have fallen into.
+        """
+        if self._marked == None:
+            return [Position(column, row) for column in range(self._size.columns) for row in range(self._size.rows)]
+
+        return self._marked.union(self._faller_cells())
+
+    def _own(self, column: int) -> [str]:
+        """
+        Returns the given column to be changed, first copying
+        it if it is shared with a clone or snapshot.
+        """
+        cells = self._field[column]
+        if self._shared or self._hashes != None:
+            column %= self._size.columns
+            self._stale.add(column)
+            if column in self._shared:
+                self._shared.discard(column)
+                cells = self._field[column] = cells[:]
+
+        return cells
+
+    def _touch(self, column: int, row: int, marked: bool = False) -> None:
+        """
+        Records that the given cell has changed, and that it may
+        hold a matched jewel if marked is True, allowing negative
+        indexes as the field does.
+        """
+        if self._dirty != None:
+            self._dirty.add(Position(column % self._size.columns, row % self._size.rows))
+        if marked and self._marked != None:
+            self._marked.add(Position(column % self._size.columns, row % self._size.rows))
+
+    def _touch_faller(self) -> None:
+        """
+        Records that the cells covered by the current faller have
+        changed, since the faller writes its pieces into them itself,
+        and that they may hold its matched pieces even once it is gone.
+        """
+        for position in self._faller_cells():
+            self._touch(*position, True)
+
+    def _column_hashes(self) -> [int]:
+        """
+        Returns the hash of every column, first hashing
+        again the columns changed since the last time.
+        """
+        keys = zobrist_keys(self._size)
+        if self._hashes == None:
+            self._hashes = [keys.hash_column(column, [_CELL_CODES[cell] for cell in self._field[column]])
+                for column in range(self._size.columns)]
+        else:
+            for column in self._stale:
+                self._hashes[column] = keys.hash_column(column, [_CELL_CODES[cell] for cell in self._field[column]])
+
+        self._stale = set()
+        return self._hashes
+
+    def _faller_state(self) -> tuple:
+        """
+        Returns the column, row, status and piece codes
+        of the current faller, or nothing if there is none.
+        """
+        if type(self._faller) != Faller:
+            return ()
+
+        return (self._faller._column, self._faller._row, self._faller._state) \
+            + tuple(self._faller._code(piece) for piece in range(self._faller._count))
+
+    def _faller_cells(self) -> [Position]:
+        """
+        Returns the cells on the board covered by the current faller,
+        which may have been changed without this game state knowing.
+        """
+        if type(self._faller) != Faller:
+            return []
 
-        return found
\ No newline at end of file
+        column = self._faller.position().column % self._size.columns
+        return [Position(column, self._faller.position().row - piece)
+            for piece in range(len(self._faller.pieces())) if self._faller.position().row - piece >= 0]
@@ -0,0 +1,676 @@
+# Alexander Gottuso 87747555
+
+from columns import *
+from columns import _CELL_STRINGS, _COLOR_MASK
+import copy
+
+_FROZEN = FROZEN << 5
+
+# translation tables used to blank or mark every cell in one pass
+_CLEAR_MATCHED = bytes(EMPTY if cell_state(code) == MATCHED else code for code in range(256))
+_MARK_MATCHED = bytes(with_state(code, MATCHED) if code != EMPTY else EMPTY for code in range(256))
+
+def _mark_matched(grid: bytes, mask: bytes) -> bytes:
+    """
+    Returns the grid with every cell that is 1 in the
+    mask marked as matched and the others left as they are.
+    """
+    # every mask byte is 0 or 1, so multiplying by 0xFF
+    # selects whole cells without carrying into neighbours
+    select = int.from_bytes(mask, 'little') * 0xFF
+    plain = int.from_bytes(grid, 'little')
+    marked = int.from_bytes(grid.translate(_MARK_MATCHED), 'little')
+    return (plain & ~select | marked & select).to_bytes(len(grid), 'little')
+
+class CompactGameState:
+    def __init__(self, field: [str] or Size, full_scan: bool = False):
+        """
+        Builds a new game state in the same way as columns.GameState,
+        but stores the board as one byte per cell in a flat,
+        column-major bytearray instead of lists of strings.
+        """
+        self._faller = None
+        self._full_scan = full_scan
+        self._dirty = None
+        self._instruments = None
+        self._hashes = None
+        self._stale = set()
+
+        if type(field) == Size:
+            self._size = field
+            self._cells = bytearray(field.rows * field.columns)
+        else:
+            self._size = Size(len(field), len(field[0]))
+            self._cells = bytearray(self._size.rows * self._size.columns)
+
+            for row in range(self._size.rows):
+                for column in range(self._size.columns):
+                    self._cells[column * self._size.rows + row] = _FROZEN | color_code(field[row][column]) \
+                        if field[row][column] != ' ' else EMPTY
+
+        # the current faller's column, head row, piece codes
+        # (top to bottom) and status are kept here rather than
+        # in the Faller so that no strings are built while ticking
+        self._column = 0
+        self._row = -1
+        self._pieces = []
+        self._state = FALLING
+
+    def size(self) -> Size:
+        return self._size
+
+    def cells(self) -> bytearray:
+        """
+        Returns the compact board, where the cell at a
+        given column and row is at column * rows + row.
+        It may be changed directly, so the whole
+        board has to be hashed again.
+        """
+        self._hashes = None
+        return self._cells
+
+    def field(self) -> FieldView:
+        """
+        Returns a read-only view of the board,
+        as columns.GameState.field() does.
+        """
+        return FieldView(self._size, self._column_strings, self._cell_string)
+
+    def faller(self) -> Faller:
+        """
+        Returns the current faller, updated to
+        reflect its state on this board.
+        """
+        if self._faller != None:
+            self._faller._colors = bytearray(piece & _COLOR_MASK for piece in self._pieces)
+            self._faller._offset = 0
+            self._faller._count = len(self._pieces)
+            self._faller._matched = sum(1 << piece for piece in range(len(self._pieces))
+                if cell_state(self._pieces[piece]) == MATCHED)
+            self._faller._state = self._state
+            self._faller._column = self._column
+            self._faller._row = self._row
+
+        return self._faller
+
+    def clone(self) -> 'CompactGameState':
+        """
+        Returns an independent copy of this game state. The flat
+        board is copied in one step, which costs less than keeping
+        track of which parts of it are shared.
+        """
+        clone = copy.copy(self)
+        clone._cells = bytearray(self._cells)
+        clone._pieces = self._pieces[:]
+        clone._faller = copy.copy(self._faller)
+        clone._dirty = None if self._dirty == None else set(self._dirty)
+        clone._hashes = None if self._hashes == None else self._hashes[:]
+        clone._stale = set(self._stale)
+        return clone
+
+    def snapshot(self) -> tuple:
+        """
+        Returns the current state of this game, which can be
+        given back to restore() any number of times.
+        """
+        return (bytes(self._cells), copy.copy(self._faller), self._column, self._row,
+            tuple(self._pieces), self._state, None if self._dirty == None else frozenset(self._dirty),
+            None if self._hashes == None else tuple(self._column_hashes()))
+
+    def restore(self, snapshot: tuple) -> None:
+        """
+        Returns this game state to the state it was in
+        when the given snapshot was taken.
+        """
+        cells, faller, self._column, self._row, pieces, self._state, dirty, hashes = snapshot
+        self._cells[:] = cells
+        self._faller = copy.copy(faller)
+        self._pieces = list(pieces)
+        self._dirty = None if dirty == None else set(dirty)
+        self._hashes = None if hashes == None else list(hashes)
+        self._stale = set()
+
+    def state_hash(self) -> int:
+        """
+        Returns the same hash as columns.GameState.state_hash()
+        would for the same board and faller.
+        """
+        result = zobrist_keys(self._size).hash_faller(self._faller_state())
+        for column_hash in self._column_hashes():
+            result ^= column_hash
+
+        return result
+
+    def __eq__(self, other) -> bool:
+        """
+        Game states are equal when their boards and fallers are,
+        which is only compared in full when their hashes match.
+        """
+        if type(other) != type(self):
+            return NotImplemented
+
+        return self.state_hash() == other.state_hash() and self._size == other._size \
+            and self._cells == other._cells and self._faller_state() == other._faller_state()
+
+    def instrument(self, instruments) -> None:
+        """
+        Attaches an instruments.Instruments to this game state,
+        or detaches it if None is given.
+        """
+        self._instruments = instruments
+
+    def tick(self) -> int or GameOverError:
+        """
+        Changes the board to reflect the passage of time,
+        exactly as columns.GameState.tick() does.
+        """
+        instruments = self._instruments
+        if instruments != None:
+            instruments.start('tick')
+            try:
+                return self._tick(instruments)
+            finally:
+                instruments.end('tick')
+        else:
+            return self._tick(None)
+
+    def _tick(self, instruments) -> int or GameOverError:
+        if instruments != None:
+            instruments.start('clear')
+
+        cleared = self._cleared()
+
+        if instruments != None:
+            instruments.end('clear')
+            instruments.count('cells_scanned', len(self._cells))
+
+        if cleared != None:
+            self._clear(cleared, instruments)
+            return CLEARED_EVENT
+
+        if self._faller == None:
+            return MATCHED_EVENT if self.find_matches() else 0
+        elif self._state == LANDED:
+            if instruments != None:
+                instruments.start('freeze')
+
+            self._faller_tick()
+            self._change_column()
+
+            if instruments != None:
+                instruments.end('freeze')
+
+            return FROZEN_EVENT
+        elif self._state == FROZEN:
+            if self.find_matches():
+                return MATCHED_EVENT
+            elif not self._can_fit():
+                raise GameOverError
+
+            return 0
+        else:
+            if instruments != None:
+                instruments.start('faller')
+
+            self._faller_fall(1)
+
+            if instruments != None:
+                instruments.end('faller')
+
+            return LANDED_EVENT if self._state == LANDED else 0
+
+    def _cleared(self) -> bytearray or None:
+        """
+        Returns the board with its matched cells emptied,
+        or None if no cell is matched.
+        """
+        cleared = self._cells.translate(_CLEAR_MATCHED)
+        return cleared if cleared != self._cells else None
+
+    def _clear(self, cleared: bytearray, instruments) -> int:
+        """
+        Given the board with its matched cells already emptied,
+        clears them, drops the current faller past them and has
+        every piece fall, returning how many jewels were cleared.
+        """
+        count = cleared.count(EMPTY) - self._cells.count(EMPTY)
+        if self._hashes != None:
+            rows = self._size.rows
+            for column in range(self._size.columns):
+                if cleared[column * rows:(column + 1) * rows] != self._cells[column * rows:(column + 1) * rows]:
+                    self._stale.add(column)
+
+        self._cells[:] = cleared
+        if instruments != None:
+            instruments.count('cascades')
+
+        if self._faller != None:
+            if instruments != None:
+                instruments.start('faller')
+
+            # matched pieces above the board are not in any cell
+            top = self._row - len(self._pieces) + 1
+            count += sum(cell_state(self._pieces[piece]) == MATCHED for piece in range(min(-top, len(self._pieces))))
+
+            self._faller_tick() # removes matched pieces
+            self._faller_fall(None)
+            self._faller_tick() # freezes remaining pieces
+            self._change_column()
+
+            if instruments != None:
+                instruments.end('faller')
+
+        self.fall()
+        return count
+
+    def fall(self) -> [int]:
+        """
+        Changes the board of this game state to
+        reflect what happens after all pieces fall
+        as far as possible, as long as
+        nothing is blocking their way.
+        Pieces keep their order within each column,
+        and the columns that changed are returned.
+        """
+        if self._instruments != None:
+            self._instruments.start('gravity')
+
+        cells = self._cells
+        rows = self._size.rows
+        changed = []
+        moved = 0
+
+        for column in range(self._size.columns):
+            base = column * rows
+            pieces = cells[base:base + rows].replace(b'\0', b'')
+
+            # a column is settled when its pieces are all at the bottom
+            if len(pieces) < rows and cells[base + rows - len(pieces):base + rows] != pieces:
+                settled = bytes(rows - len(pieces)) + pieces
+                for row in range(rows):
+                    if settled[row] != cells[base + row]:
+                        self._touch(column, row)
+                        moved += 1
+
+                cells[base:base + rows] = settled
+                changed.append(column)
+                self._changed(column)
+
+        if self._instruments != None:
+            self._instruments.end('gravity')
+            self._instruments.count('cells_moved', moved)
+
+        return changed
+
+    def new_faller(self, faller: Faller) -> None:
+        """
+        Given a faller, changes the board to show the head
+        of a new Faller which is based on that string.
+        """
+        if not -self._size.columns <= faller.position().column < self._size.columns:
+            raise IndexError('column index out of range')
+
+        for position in self._faller_cells():
+            self._touch(*position)
+
+        self._faller = faller
+        self._column = faller.position().column
+        self._row = faller.position().row
+        self._pieces = [cell_code(piece) for piece in faller.pieces()]
+        self._state = faller._state
+
+        if cell_state(self._cells[self._base(self._column)]) == FROZEN:
+            raise GameOverError
+        else:
+            self._faller_fall(1)
+
+    def move_faller(self, direction: int) -> None:
+        """
+        Given a direction, where -1 is left and 1 is right,
+        change the board so that the current faller is moved over
+        once in that direction, as columns.GameState.move_faller() does.
+        """
+        if not 0 <= self._column + direction < self._size.columns:
+            raise InvalidMoveError
+
+        for piece in range(len(self._pieces)):
+            target = self._index(self._column + direction, self._row - piece)
+            if target == None:
+                continue
+            if self._cells[target] != EMPTY:
+                raise InvalidMoveError
+
+            self._set(target, self._pieces[-piece - 1])
+            self._set(self._index(self._column, self._row - piece), EMPTY)
+            self._touch(self._column + direction, self._row - piece)
+            self._changed(self._column + direction)
+            self._changed(self._column)
+
+        self._column += direction
+        self._check_landing()
+
+    def rotate_faller(self) -> None:
+        """
+        Rotates the current faller so that its bottom
+        piece is on top, as columns.Faller.rotate() does.
+        """
+        if self._faller != None and self._pieces:
+            self._pieces.insert(0, self._pieces.pop())
+            self._change_column()
+
+    def hard_drop(self, resolve: bool = False) -> [int]:
+        """
+        Drops a falling faller straight onto whatever is
+        below it, exactly as columns.GameState.hard_drop() does.
+        """
+        events = []
+        if self._faller != None and self._state == FALLING:
+            if self._instruments != None:
+                self._instruments.start('drop')
+
+            base = self._base(self._column)
+            rows = self._size.rows
+            count = len(self._pieces)
+
+            # the empty cells below the faller are
+            # the ones before the first jewel under it
+            below = self._cells[base + self._row + 1:base + rows]
+            landing = self._row + 1 + len(below) - len(below.lstrip(b'\0'))
+
+            for piece in range(count):
+                if self._row - piece >= 0:
+                    self._set(base + self._row - piece, EMPTY)
+
+            self._row = landing - 1
+            self._change_column()
+            self._check_landing()
+            events.append(LANDED_EVENT if self._state == LANDED else 0)
+
+            if self._instruments != None:
+                self._instruments.end('drop')
+
+        if resolve:
+            while True:
+                events.append(self.tick())
+                if events[-1] == 0 and (self._faller == None or self._state == FROZEN):
+                    break
+
+        return events
+
+    def resolve(self) -> [int]:
+        """
+        Clears matches, lets everything fall and searches again
+        until no matches are left, returning the number of jewels
+        cleared by each step of the chain. This ends as ticking
+        would, raising a GameOverError if the faller still cannot
+        fit, but without a tick between steps. Nothing is done
+        while the faller is still moving.
+        """
+        chain = []
+        if self._faller != None and self._state != FROZEN:
+            return chain
+
+        if self._instruments != None:
+            self._instruments.start('resolve')
+
+        while True:
+            cleared = self._cleared()
+            if cleared == None:
+                if not self.find_matches():
+                    break
+                cleared = self._cleared()
+
+            chain.append(self._clear(cleared, self._instruments))
+
+        if self._instruments != None:
+            self._instruments.end('resolve')
+            self._instruments.count('chain', len(chain))
+
+        if self._faller != None and not self._can_fit():
+            raise GameOverError
+
+        return chain
+
+    def find_matches(self) -> bool:
+        """
+        Searches the field for match-3+ patterns;
+        if any match is found, the board is changed
+        to reflect all matches and True is returned.
+        Only runs through cells that changed since the last
+        search are looked for, unless the whole board must be.
+        """
+        if self._instruments != None:
+            self._instruments.start('match')
+
+        rows = self._size.rows
+        columns = self._size.columns
+        off_rows = 0
+
+        if self._faller != None and not self._can_fit():
+            off_rows = 2 - self._row
+
+        if self._full_scan or self._dirty == None or off_rows > 0:
+            height = rows + off_rows
+            grid = self._cells
+            if off_rows > 0:
+                grid = bytearray(height * columns)
+                for column in range(columns):
+                    grid[column * height + off_rows:(column + 1) * height] = self._cells[column * rows:(column + 1) * rows]
+                for piece in range(off_rows):
+                    grid[self._base(self._column) // rows * height + piece] = self._pieces[piece - 3]
+
+            mask = match_mask(grid, height)
+            found = 1 in mask
+            scanned = len(grid)
+            matched = mask.count(1)
+
+            if found:
+                grid = _mark_matched(grid, mask)
+
+                for column in range(columns):
+                    cells = grid[column * height + off_rows:(column + 1) * height]
+                    if cells != self._cells[column * rows:(column + 1) * rows]:
+                        self._cells[column * rows:(column + 1) * rows] = cells
+                        self._changed(column)
+        else:
+            height = rows
+            grid = self._cells
+            changed = self._dirty.union(self._faller_cells())
+            scanned = len(changed)
+
+            # after gravity many cells may have changed, and following
+            # runs from all of them at once over the whole board is
+            # sooner than following them from each in turn
+            if len(changed) * 16 > len(grid):
+                seeds = bytearray(len(grid))
+                for column, row in changed:
+                    seeds[column * rows + row] = 1
+
+                mask = seeded_match_mask(grid, rows, seeds)
+                scanned = len(grid)
+                matched = []
+                index = mask.find(1)
+                while index != -1:
+                    matched.append(Position(index // rows, index % rows))
+                    index = mask.find(1, index + 1)
+            else:
+                matched = runs_through(lambda column, row: grid[column * rows + row], EMPTY, self._size, changed)
+
+            for column, row in matched:
+                grid[column * rows + row] = with_state(grid[column * rows + row], MATCHED)
+                self._changed(column)
+            found = len(matched) > 0
+            matched = len(matched)
+
+        self._dirty = set()
+
+        if found and self._faller != None:
+            base = self._base(self._column) // rows * height
+            for piece in range(len(self._pieces)):
+                row = piece if off_rows > 0 else self._row - (len(self._pieces) - 1) + piece
+                self._pieces[piece] = grid[base + (row + height if row < 0 else row)]
+
+        if self._instruments != None:
+            self._instruments.end('match')
+            self._instruments.count('cells_scanned', scanned)
+            self._instruments.count('matches_found', matched)
+
+        return found
+
+    def _touch(self, column: int, row: int) -> None:
+        """
+        Records that the given cell has changed,
+        allowing negative indexes as the field does.
+        """
+        if self._dirty != None:
+            self._dirty.add(Position(column % self._size.columns, row % self._size.rows))
+
+    def _changed(self, column: int) -> None:
+        """
+        Records that the given column has to be hashed again.
+        """
+        if self._hashes != None:
+            self._stale.add(column % self._size.columns)
+
+    def _column_hashes(self) -> [int]:
+        """
+        Returns the hash of every column, first hashing
+        again the columns changed since the last time.
+        """
+        keys = zobrist_keys(self._size)
+        rows = self._size.rows
+        if self._hashes == None:
+            self._hashes = [keys.hash_column(column, self._cells[column * rows:(column + 1) * rows])
+                for column in range(self._size.columns)]
+        else:
+            for column in self._stale:
+                self._hashes[column] = keys.hash_column(column, self._cells[column * rows:(column + 1) * rows])
+
+        self._stale = set()
+        return self._hashes
+
+    def _column_strings(self, column: int) -> [str]:
+        rows = self._size.rows
+        return [_CELL_STRINGS[code] for code in self._cells[column * rows:(column + 1) * rows]]
+
+    def _cell_string(self, column: int, row: int) -> str:
+        return _CELL_STRINGS[self._cells[column * self._size.rows + row]]
+
+    def _faller_state(self) -> tuple:
+        if self._faller == None:
+            return ()
+
+        return (self._column, self._row, self._state) + tuple(self._pieces)
+
+    def _faller_cells(self) -> [Position]:
+        """
+        Returns the cells on the board covered by the current faller.
+        """
+        if self._faller == None:
+            return []
+
+        column = self._column % self._size.columns
+        return [Position(column, self._row - piece) for piece in range(len(self._pieces)) if self._row - piece >= 0]
+
+    def _base(self, column: int) -> int:
+        """
+        Returns the offset of the given column in the compact board,
+        allowing negative columns as list indexing would.
+        """
+        if not -self._size.columns <= column < self._size.columns:
+            raise IndexError('column index out of range')
+
+        return column % self._size.columns * self._size.rows
+
+    def _index(self, column: int, row: int) -> int or None:
+        """
+        Returns the offset of the given cell in the compact board,
+        or None where indexing the same cell of a list field
+        would raise an IndexError.
+        """
+        rows = self._size.rows
+        if not (-self._size.columns <= column < self._size.columns and -rows <= row < rows):
+            return None
+
+        return column % self._size.columns * rows + row % rows
+
+    def _set(self, index: int, code: int) -> None:
+        """
+        Writes a code into the cell at the given offset. Every
+        move of the faller writes through here, so that a
+        subclass keeping more than the bytes can follow it.
+        """
+        self._cells[index] = code
+
+    def _change_column(self) -> None:
+        """
+        Writes the current faller's pieces into its column.
+        """
+        base = self._base(self._column)
+        self._changed(self._column)
+        for piece in range(len(self._pieces)):
+            if self._row - piece >= 0:
+                self._set(base + self._row - piece, self._pieces[-piece - 1])
+                self._touch(self._column, self._row - piece)
+
+    def _can_fit(self) -> bool:
+        return not (self._state != FALLING and self._row < len(self._pieces) - 1)
+
+    def _check_landing(self) -> None:
+        """
+        Updates whether the current faller is landed,
+        rewriting its pieces if that status has changed.
+        """
+        if self._state == FROZEN:
+            return
+
+        changed = self._state == LANDED
+        base = self._base(self._column)
+
+        if self._row == self._size.rows - 1 or cell_state(self._cells[base + self._row + 1]) == FROZEN:
+            self._state = LANDED
+        else:
+            self._state = FALLING
+
+        for piece in range(len(self._pieces)):
+            self._pieces[piece] = with_state(self._pieces[piece], self._state)
+
+        if (self._state == LANDED) != changed:
+            self._change_column()
+
+    def _faller_fall(self, amount: int or None) -> None:
+        """
+        Has the current faller fall as far as possible if the
+        amount is None, and otherwise by at most that amount.
+        """
+        base = self._base(self._column)
+        stop = self._size.rows if amount == None else min(self._row + amount + 1, self._size.rows)
+
+        for cell in range(self._row + 1, stop):
+            if self._cells[base + cell] == EMPTY:
+                self._row = cell
+                self._change_column()
+
+                if cell - len(self._pieces) >= 0:
+                    self._set(base + cell - len(self._pieces), EMPTY)
+                    self._changed(self._column)
+
+        self._check_landing()
+
+    def _faller_tick(self) -> None:
+        """
+        Removes matched pieces from the current faller and
+        freezes its pieces if they have all landed.
+        """
+        count = len(self._pieces)
+        last_matched = count > 0 and cell_state(self._pieces[-1]) == MATCHED
+        self._pieces = [piece for piece in self._pieces if cell_state(piece) != MATCHED]
+
+        if self._pieces and last_matched:
+            self._row -= count - len(self._pieces)
+
+        if not self._pieces or self._state == LANDED:
+            for piece in range(len(self._pieces)):
+                self._pieces[piece] = with_state(self._pieces[piece], FROZEN)
+
+            self._state = FROZEN
@@ -0,0 +1,95 @@
+# Alexander Gottuso 87747555
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+from columns import *
+from columns import _CELL_CODES
+from compact import CompactGameState
+import search
+
+PlacementScore = namedtuple('PlacementScore', ('placement', 'cleared', 'height', 'game_over'))
+
+def encode(game) -> (Size, bytes):
+    """
+    Returns the size and compact cells of either kind
+    of game state's board, which is all a worker needs.
+    """
+    if type(game) == CompactGameState:
+        return game.size(), bytes(game.cells())
+
+    return game.size(), bytes(_CELL_CODES[cell] for column in game.field() for cell in column)
+
+def score_placements(size: Size, cells: bytes, column: int, pieces: str, chosen: [search.Placement]) -> [PlacementScore]:
+    """
+    Simulates each chosen placement of the described faller on the
+    encoded board until nothing more happens, and scores it.
+    Placements that cannot be reached are left out.
+    """
+    game = CompactGameState(size)
+    game.cells()[:] = cells
+
+    scores = []
+    for placement in chosen:
+        try:
+            child, cleared = search.place(game, Faller(column, pieces), placement)
+        except InvalidMoveError:
+            continue
+
+        if child == None:
+            scores.append(PlacementScore(placement, 0, size.rows, True))
+        else:
+            height = max(size.rows - child.cells()[child_column * size.rows:(child_column + 1) * size.rows].count(EMPTY)
+                for child_column in range(size.columns))
+            scores.append(PlacementScore(placement, cleared, height, False))
+
+    return scores
+
+def _score_placements(task: tuple) -> [PlacementScore]:
+    return score_placements(*task)
+
+def _warm_up(worker: int) -> int:
+    score_placements(Size(4, 3), bytes(12), 0, 'XYZ', [search.Placement(1, 0)])
+    return os.getpid()
+
+class PlacementEvaluator:
+    def __init__(self, workers: int = None):
+        """
+        Scores every placement of a faller in parallel across a pool
+        of worker processes that is started, and warmed up, once
+        and kept until close() is called. Can be used with 'with'.
+        """
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(self._workers)
+
+        # starting every worker now keeps the cost of spawning
+        # processes out of the first evaluation
+        list(self._executor.map(_warm_up, range(self._workers)))
+
+    def __enter__(self) -> 'PlacementEvaluator':
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def evaluate(self, game, faller: Faller) -> [PlacementScore]:
+        """
+        Given a game with no faller still moving and the faller
+        entering it next, returns the score of every placement of
+        that faller which can be reached, in the order given by
+        search.placements().
+        """
+        size, cells = encode(game)
+        column, pieces = search.describe(faller)
+        candidates = search.placements(faller, size.columns)
+
+        # each worker gets one share of the placements,
+        # so the board is only sent to it once
+        shares = [candidates[worker::self._workers] for worker in range(min(self._workers, len(candidates)))]
+        results = self._executor.map(_score_placements, [(size, cells, column, pieces, share) for share in shares])
+
+        order = {placement: index for index, placement in enumerate(candidates)}
+        return sorted((score for share in results for score in share), key = lambda score: order[score.placement])
+
+    def close(self) -> None:
+        self._executor.shutdown()
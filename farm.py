@@ -0,0 +1,81 @@
+# Alexander Gottuso 87747555
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import os
+import columns
+import project4
+import batch
+
+Outcome = namedtuple('Outcome', ('name', 'ticks', 'cleared', 'game_over', 'board'))
+Summary = namedtuple('Summary', ('games', 'game_overs', 'ticks', 'cleared', 'outcomes'))
+
+def board_hash(game: columns.GameState) -> str:
+    """
+    Returns a short hash of the given game's board that is
+    the same in every process, unlike the built-in hash().
+    """
+    return hashlib.blake2b(project4.render_field(game).encode(), digest_size=8).hexdigest()
+
+def replay(name: str, lines: [str]) -> Outcome:
+    """
+    Runs one game script to completion, quitting or game over,
+    counting the ticks it survived and the jewels it matched.
+    """
+    result = batch.run_script(*batch.read_script(lines))
+    return Outcome(name, result.ticks, result.cleared, result.game_over, board_hash(result.game))
+
+def _replay(game: (str, [str])) -> Outcome:
+    return replay(*game)
+
+def summarize(outcomes: [Outcome]) -> Summary:
+    return Summary(len(outcomes), sum(outcome.game_over for outcome in outcomes),
+        sum(outcome.ticks for outcome in outcomes), sum(outcome.cleared for outcome in outcomes), outcomes)
+
+def pool_shape(jobs: int, workers: int = None) -> (int, int):
+    """
+    Returns the number of worker processes to share the given
+    number of jobs, all cores unless workers is given, and how
+    many jobs to hand each of them at a time.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    # a few chunks per worker keeps them all busy without
+    # paying for one round trip per game
+    return workers, max(1, jobs // (workers * 4))
+
+def run_farm(games: [(str, [str])], workers: int = None) -> Summary:
+    """
+    Given (name, script lines) pairs, replays every game across
+    a pool of worker processes and summarizes the outcomes,
+    which are always in the same order as the given games.
+    """
+    workers, chunksize = pool_shape(len(games), workers)
+    with ProcessPoolExecutor(workers) as executor:
+        return summarize(list(executor.map(_replay, games, chunksize=chunksize)))
+
+def run() -> None:
+    """
+    Replays every given script file across all cores and
+    prints each game's outcome followed by a summary.
+    """
+    parser = argparse.ArgumentParser(description='Replays many Columns scripts in parallel.')
+    parser.add_argument('scripts', nargs='+', help='files holding the field setup and commands')
+    parser.add_argument('-w', '--workers', type=int, help='number of worker processes (default: all cores)')
+    arguments = parser.parse_args()
+
+    games = []
+    for path in arguments.scripts:
+        with open(path) as script:
+            games.append((path, script.read().splitlines()))
+
+    summary = run_farm(games, arguments.workers)
+    for outcome in summary.outcomes:
+        print(f'{outcome.name}\t{outcome.ticks}\t{outcome.cleared}\t{"GAME OVER" if outcome.game_over else "-"}\t{outcome.board}')
+
+    print(f'{summary.games} games, {summary.game_overs} game overs, {summary.ticks} ticks, {summary.cleared} jewels cleared')
+
+if __name__ == "__main__":
+    run()
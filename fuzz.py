@@ -0,0 +1,344 @@
+# Alexander Gottuso 87747555
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import random
+import sys
+import time
+import batch
+import bench_columns
+import bitboard
+import columns
+import compact
+import farm
+import project4
+
+BACKENDS = {
+    'game': columns.GameState,
+    'compact': compact.CompactGameState,
+    'bitboard': bitboard.BitboardGameState,
+    'cached': lambda field, full_scan: columns.GameState(field, full_scan, columns.ColumnCache(256))}
+
+# Every backend is played against a columns.GameState reference, as
+# pairs of whether the backend and the reference search the whole
+# board. A search of only the changed cells has to find everything
+# a search of the whole board does, so incremental backends are also
+# played against a full-board reference.
+SEARCHES = {
+    'same': ((False, False), (True, True)),
+    'full': ((False, True),),
+    'all': ((False, False), (True, True), (False, True))}
+
+COLORS = 'STVWXYZ'
+
+# the commands project4 reads, along with a few only this harness gives:
+# a hard drop, resolving every match, going on with a clone of the game,
+# and taking a snapshot, ticking and restoring the snapshot
+_COMMANDS = ('', '', '', '', '', '', 'F', 'F', 'R', '<', '>', 'D', 'S', 'C', 'U')
+_EXTRA = {'D', 'S', 'C', 'U'}
+
+Game = namedtuple('Game', ('seed', 'field', 'commands'))
+Divergence = namedtuple('Divergence', ('game', 'full_scan', 'reference_scan', 'step', 'tick', 'expected', 'actual'))
+Summary = namedtuple('Summary', ('games', 'steps', 'seconds', 'divergences'))
+
+def random_game(seed: int, max_rows: int = 13, max_columns: int = 7, length: int = 200) -> Game:
+    """
+    Returns a seeded random board, with between 3 and 5
+    colors of jewels, and the given number of commands.
+    """
+    generator = random.Random(seed)
+    size = columns.Size(generator.randint(3, max_rows), generator.randint(3, max_columns))
+    colors = COLORS[:generator.randint(3, 5)]
+    field = bench_columns.random_field(size, generator.random(), colors, generator.getrandbits(32))
+
+    commands = []
+    for _ in range(length):
+        action = generator.choice(_COMMANDS)
+        if action == 'F':
+            commands.append(project4.Command('F', generator.randrange(size.columns),
+                ''.join(generator.choice(colors) for _ in range(3))))
+        else:
+            commands.append(project4.Command(action, None, None))
+
+    return Game(seed, field, commands)
+
+def apply(game, command: project4.Command) -> tuple:
+    """
+    Applies one command to the given game, returning the game
+    to go on with and what the command returned, or the name
+    of the error it raised. Commands are left out wherever a
+    player could not give them: a new faller while one is still
+    moving, and moving or rotating when there is no faller.
+    """
+    action = command.action
+    try:
+        if action == '':
+            return game, game.tick()
+        elif action == 'F':
+            if game.faller() == None or game.faller().frozen():
+                game.new_faller(columns.Faller(command.column, command.pieces))
+        elif game.faller() == None:
+            pass
+        elif action == 'R':
+            game.rotate_faller()
+        elif action == '<' or action == '>':
+            game.move_faller(-1 if action == '<' else 1)
+        elif action == 'D':
+            return game, game.hard_drop()
+        elif action == 'S':
+            return game, game.resolve()
+
+        if action == 'C':
+            return game.clone(), None
+        elif action == 'U':
+            snapshot = game.snapshot()
+            try:
+                game.tick()
+            finally:
+                game.restore(snapshot)
+    except Exception as error:
+        return game, type(error).__name__
+
+    return game, None
+
+def describe(game, outcome) -> str:
+    """
+    Returns what the given command returned, the frame
+    and the faller of a game, to be shown side by side.
+    """
+    faller = game.faller()
+    if faller != None:
+        faller = f'faller at {tuple(faller.position())}: {" ".join(faller.pieces())}' \
+            + (', frozen' if faller.frozen() else ', landed' if faller.landed() else '')
+
+    return f'returned {outcome!r}, {faller or "no faller"}\n{game.field().render()}'
+
+def play(game: Game, full_scan: bool, backends: {str: object}, reference_scan: bool = None) -> {str: Divergence}:
+    """
+    Plays the given game on every given backend, built from the
+    field and full_scan by its factory, and on a columns.GameState
+    that searches the whole board if reference_scan is True, or as
+    the backends do if it is None, all in lockstep. After every
+    command, what it returned and the state hash of each backend
+    are compared with the reference. Returns the first divergence
+    of every backend that had one.
+    """
+    reference_scan = full_scan if reference_scan == None else reference_scan
+    reference = columns.GameState(game.field, reference_scan)
+    playing = {name: make(game.field, full_scan) for name, make in backends.items()}
+    divergences = {}
+
+    def check(step: int, tick: int, outcome, outcomes: dict, last: bool) -> None:
+        expected = reference.state_hash()
+        for name, state in list(playing.items()):
+            # boards are only compared in full at the end, since
+            # a board that differs has a different hash
+            if outcomes[name] != outcome or state.state_hash() != expected \
+                or last and describe(state, None) != describe(reference, None):
+
+                divergences[name] = Divergence(game, full_scan, reference_scan, step, tick,
+                    describe(reference, outcome), describe(state, outcomes[name]))
+                del playing[name]
+
+    outcomes = {}
+    for name, state in playing.items():
+        outcomes[name] = (state.fall(), state.find_matches())
+    check(-1, 0, (reference.fall(), reference.find_matches()), outcomes, not game.commands)
+
+    tick = 0
+    for step, command in enumerate(game.commands):
+        if not playing:
+            break
+
+        tick += command.action == ''
+        for name, state in list(playing.items()):
+            playing[name], outcomes[name] = apply(state, command)
+        reference, outcome = apply(reference, command)
+
+        ended = type(outcome) == str and outcome != 'InvalidMoveError'
+        check(step, tick, outcome, outcomes, ended or step == len(game.commands) - 1)
+        if ended:
+            break
+
+    return divergences
+
+def minimize(divergence: Divergence, name: str, make) -> Divergence:
+    """
+    Returns the smallest game found that still makes the given
+    backend diverge, by leaving out ever smaller runs of commands
+    and then blanking whatever cells of the board it can.
+    """
+    def diverges(field: [str], commands: [project4.Command]) -> Divergence or None:
+        return play(Game(divergence.game.seed, field, commands), divergence.full_scan,
+            {name: make}, divergence.reference_scan).get(name)
+
+    best = divergence
+    field = divergence.game.field
+    commands = divergence.game.commands[:divergence.step + 1]
+
+    chunk = max(1, len(commands) // 2)
+    while True:
+        start = 0
+        while start < len(commands):
+            found = diverges(field, commands[:start] + commands[start + chunk:])
+            if found != None:
+                best = found
+                commands = found.game.commands[:found.step + 1]
+            else:
+                start += chunk
+
+        if chunk == 1:
+            break
+        chunk //= 2
+
+    for row in range(len(field)):
+        for column in range(len(field[row])):
+            if field[row][column] != ' ':
+                blanked = field[:row] + [field[row][:column] + ' ' + field[row][column + 1:]] + field[row + 1:]
+                found = diverges(blanked, commands)
+                if found != None:
+                    best = found
+                    field = blanked
+                    commands = found.game.commands[:found.step + 1]
+
+    return best
+
+def script(game: Game) -> [str]:
+    """
+    Returns the given game as the lines project4 reads, where
+    any line of D, S, C or U is a command only this harness gives.
+    """
+    lines = [str(len(game.field)), str(len(game.field[0])), 'CONTENTS'] + list(game.field)
+    for command in game.commands:
+        if command.action == 'F':
+            lines.append(f'F {command.column + 1} {" ".join(command.pieces)}')
+        else:
+            lines.append(command.action)
+
+    return lines
+
+def read_game(lines: [str], seed: int = None) -> Game:
+    """
+    Reads a game back from lines in the format script() writes.
+    """
+    field, commands = batch.read_script(lines)
+    if type(field) == columns.Size:
+        field = [' ' * field.columns] * field.rows
+
+    return Game(seed, field, [project4.Command(line, None, None) if line in _EXTRA
+        else project4.parse_command(line) for line in commands])
+
+def _fuzz_seeds(task: tuple) -> (int, [(str, Divergence)]):
+    """
+    Plays the games of a range of seeds with every named
+    backend and each pair of searches, returning the number
+    of commands given and each divergence found, minimised.
+    """
+    names, seeds, max_rows, max_columns, length, searches = task
+    steps = 0
+    found = []
+
+    for seed in seeds:
+        game = random_game(seed, max_rows, max_columns, length)
+        for full_scan, reference_scan in SEARCHES[searches]:
+            # GameState is only played against a reference that searches differently
+            backends = {name: BACKENDS[name] for name in names
+                if name != 'game' or full_scan != reference_scan}
+            if not backends:
+                continue
+
+            steps += len(game.commands)
+            for name, divergence in play(game, full_scan, backends, reference_scan).items():
+                found.append((name, minimize(divergence, name, backends[name])))
+
+    return steps, found
+
+def fuzz(names: [str], games: int, seed: int = 0, max_rows: int = 13, max_columns: int = 7,
+    length: int = 200, workers: int = 1, searches: str = 'all') -> Summary:
+    """
+    Plays the given number of seeded games, starting from the
+    given seed, against every named backend with each pair of
+    searches in SEARCHES[searches] and returns what was found.
+    With more than one worker, the seeds are split across a
+    pool of processes; the result does not change.
+    """
+    start = time.perf_counter()
+    workers, chunk = farm.pool_shape(games, workers)
+    tasks = [(names, range(first, min(first + chunk, seed + games)), max_rows, max_columns, length, searches)
+        for first in range(seed, seed + games, chunk)]
+
+    if workers == 1:
+        results = [_fuzz_seeds(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_fuzz_seeds, tasks))
+
+    return Summary(games, sum(steps for steps, found in results),
+        time.perf_counter() - start, [divergence for steps, found in results for divergence in found])
+
+def report(name: str, divergence: Divergence) -> str:
+    """
+    Returns a description of a divergence, showing the reference
+    and the backend side by side, and the script reproducing it.
+    """
+    search = 'full-board' if divergence.full_scan else 'incremental'
+    if divergence.reference_scan != divergence.full_scan:
+        search += ' against full-board' if divergence.reference_scan else ' against incremental'
+    where = 'while settling the board' if divergence.step < 0 \
+        else f'at command {divergence.step + 1} ({divergence.game.commands[divergence.step].action or "tick"!r}), tick {divergence.tick}'
+
+    expected = divergence.expected.splitlines()
+    actual = divergence.actual.splitlines()
+    width = max(len(line) for line in expected)
+    rows = [f'{line:<{width}}    {other}' for line, other in
+        zip(expected + [''] * (len(actual) - len(expected)), actual + [''] * (len(expected) - len(actual)))]
+
+    return '\n'.join([f'DIVERGENCE in {name} with {search} search, seed {divergence.game.seed}, {where}',
+        f'{"GameState":<{width}}    {name}'] + rows + ['reproduction:'] + script(divergence.game)) + '\n'
+
+def run() -> None:
+    """
+    Fuzzes the backends and exits with status 1 if any of them
+    diverged from columns.GameState, or replays a reproduction.
+    """
+    parser = argparse.ArgumentParser(description='Plays seeded random games on every engine and compares them.')
+    parser.add_argument('-b', '--backend', action='append', choices=BACKENDS, help='backend to fuzz (default: all)')
+    parser.add_argument('-n', '--games', type=int, default=1000, help='number of games to play (default: 1000)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game (default: 0)')
+    parser.add_argument('--length', type=int, default=200, help='commands in each game (default: 200)')
+    parser.add_argument('--max-rows', type=int, default=13)
+    parser.add_argument('--max-columns', type=int, default=7)
+    parser.add_argument('-w', '--workers', type=int, default=1, help='number of worker processes, 0 for all cores (default: 1)')
+    parser.add_argument('--replay', help='play the reproduction in this file, as written by a report, instead')
+    parser.add_argument('-s', '--searches', choices=SEARCHES, default='all',
+        help='play each search against the same (same), incremental against full-board (full) or both (default: all)')
+    parser.add_argument('--full-scan', action='store_true', help='search the whole board when replaying')
+    parser.add_argument('--reference-full-scan', action='store_true',
+        help='have the reference search the whole board when replaying')
+    arguments = parser.parse_args()
+
+    names = arguments.backend or list(BACKENDS)
+    if arguments.replay != None:
+        with open(arguments.replay) as reproduction:
+            game = read_game(reproduction.read().splitlines())
+
+        divergences = play(game, arguments.full_scan, {name: BACKENDS[name] for name in names},
+            arguments.full_scan or arguments.reference_full_scan)
+        for name, divergence in divergences.items():
+            sys.stdout.write(report(name, divergence))
+
+        print(f'{len(names) - len(divergences)} of {len(names)} backends agree')
+        sys.exit(1 if divergences else 0)
+
+    summary = fuzz(names, arguments.games, arguments.seed, arguments.max_rows, arguments.max_columns,
+        arguments.length, arguments.workers, arguments.searches)
+    for name, divergence in summary.divergences:
+        sys.stdout.write(report(name, divergence))
+
+    print(f'{summary.games} games, {summary.steps} commands on {len(names)} backends in {summary.seconds:.1f}s '
+        f'({summary.games / summary.seconds:.0f} games/s), {len(summary.divergences)} divergences')
+    sys.exit(1 if summary.divergences else 0)
+
+if __name__ == "__main__":
+    run()
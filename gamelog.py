@@ -0,0 +1,406 @@
+# Alexander Gottuso 87747555
+
+import argparse
+import bisect
+import sys
+import columns
+from columns import _CELL_CODES, _CELL_STRINGS
+
+# A log starts with MAGIC, the board size, the keyframe interval and
+# a keyframe of the initial game. Each record after that is a varint
+# holding an opcode in its low 3 bits and, for the commands that can
+# repeat, how many more times it was repeated in the rest. A closed
+# log ends with an index of its keyframes, then the offset of that
+# index in 8 bytes and MAGIC again. A keyframe record whose count
+# is _RESTORED holds the game as restore() left it; those are not
+# in the index and are applied when they are replayed.
+MAGIC = b'CLOG'
+VERSION = 2
+
+_TICK = 0
+_ROTATE = 1
+_LEFT = 2
+_RIGHT = 3
+_FALLER = 4
+_KEYFRAME = 5
+_END = 6
+_DROP = 7
+
+_OPCODE_BITS = 3
+_OPCODE_MASK = (1 << _OPCODE_BITS) - 1
+_RESTORED = 1
+
+class GameLogError(Exception):
+    pass
+
+def _write_varint(output: bytearray, value: int) -> None:
+    while value >= 0x80:
+        output.append(value & 0x7F | 0x80)
+        value >>= 7
+
+    output.append(value)
+
+def _read_varint(data, offset: int) -> (int, int):
+    """
+    Returns the varint at the given offset of the data
+    and the offset just past it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[offset]
+        except IndexError:
+            raise GameLogError('log ends in the middle of a record')
+
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, offset
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if value & 1 == 0 else -(value >> 1) - 1
+
+def _write_keyframe(output: bytearray, tick: int, snapshot: tuple) -> None:
+    """
+    Writes the board and faller of a GameState snapshot.
+    """
+    field, faller = snapshot[:2]
+    _write_varint(output, tick)
+
+    if type(faller) == columns.Faller:
+        output.append(1)
+        for value in (_zigzag(faller._column), _zigzag(faller._row), faller._offset,
+            faller._count, faller._state, faller._matched):
+            _write_varint(output, value)
+        output += faller._colors[:faller._count]
+    else:
+        output.append(0)
+
+    for column in field:
+        output += bytes(_CELL_CODES[cell] for cell in column)
+
+def _read_keyframe(data, offset: int, size: columns.Size) -> (int, tuple, int):
+    """
+    Returns the tick of the keyframe at the given offset,
+    a snapshot that restore() accepts and the offset past it.
+    """
+    tick, offset = _read_varint(data, offset)
+    if offset >= len(data):
+        raise GameLogError('log ends in the middle of a keyframe')
+
+    faller = None
+    offset += 1
+    if data[offset - 1] == 1:
+        values = []
+        for _ in range(6):
+            value, offset = _read_varint(data, offset)
+            values.append(value)
+
+        faller = columns.Faller.__new__(columns.Faller)
+        faller._column, faller._row = _unzigzag(values[0]), _unzigzag(values[1])
+        faller._offset, faller._count, faller._state, faller._matched = values[2:]
+        faller._colors = bytearray(data[offset:offset + faller._count])
+        offset += faller._count
+
+    cells = size.rows * size.columns
+    if offset + cells > len(data):
+        raise GameLogError('log ends in the middle of a keyframe')
+
+    codes = bytes(data[offset:offset + cells])
+    field = tuple([_CELL_STRINGS[code] for code in codes[column * size.rows:(column + 1) * size.rows]]
+        for column in range(size.columns))
+
+    return tick, (field, faller, None, None), offset + cells
+
+class GameLogWriter:
+    def __init__(self, output, game: columns.GameState, interval: int = 256):
+        """
+        Writes a binary log of everything done to the given game
+        to output, a file opened for writing bytes, once attached
+        with game.record(). A keyframe of the whole game is kept
+        every interval ticks so that a reader can start from it.
+        """
+        self._output = output
+        self._interval = interval
+        self._buffer = bytearray(MAGIC)
+        self._buffer.append(VERSION)
+        for value in (game.size().rows, game.size().columns, interval):
+            _write_varint(self._buffer, value)
+
+        self._written = 0
+        self._ticks = 0
+        self._keyframes = [(0, len(self._buffer))]
+        _write_keyframe(self._buffer, 0, game.snapshot())
+
+        # the last command is held back while it is being repeated
+        self._opcode = None
+        self._repeats = 0
+
+    def tick(self, game: columns.GameState) -> None:
+        self._command(_TICK)
+        self._ticks += 1
+
+        if self._ticks % self._interval == 0:
+            self._flush_command()
+            self._write_varint(_KEYFRAME)
+            self._keyframes.append((self._ticks, self._written + len(self._buffer)))
+            _write_keyframe(self._buffer, self._ticks, game.snapshot())
+
+    def rotate(self) -> None:
+        self._command(_ROTATE)
+
+    def move(self, direction: int) -> None:
+        self._command(_LEFT if direction < 0 else _RIGHT)
+
+    def drop(self) -> None:
+        self._command(_DROP)
+
+    def restore(self, game: columns.GameState) -> None:
+        """
+        Writes a keyframe of the game as it is after
+        restore(), which replaying then restores as well.
+        """
+        self._flush_command()
+        self._write_varint(_RESTORED << _OPCODE_BITS | _KEYFRAME)
+        _write_keyframe(self._buffer, self._ticks, game.snapshot())
+
+    def new_faller(self, faller: columns.Faller) -> None:
+        self._flush_command()
+        self._write_varint(_FALLER)
+        self._write_varint(faller.position().column)
+        self._write_varint(len(faller.pieces()))
+        self._buffer += bytes(columns.color_code(piece[1]) for piece in faller.pieces())
+
+    def ticks(self) -> int:
+        return self._ticks
+
+    def close(self) -> None:
+        """
+        Ends the log with the index of its keyframes and writes
+        out whatever is left. The output itself is not closed.
+        """
+        self._flush_command()
+        self._write_varint(_END)
+
+        index = self._written + len(self._buffer)
+        self._write_varint(self._ticks)
+        self._write_varint(len(self._keyframes))
+        for tick, offset in self._keyframes:
+            self._write_varint(tick)
+            self._write_varint(offset)
+
+        self._buffer += index.to_bytes(8, 'little') + MAGIC
+        self._output.write(self._buffer)
+        self._buffer = bytearray()
+
+    def _command(self, opcode: int) -> None:
+        if opcode == self._opcode:
+            self._repeats += 1
+            return
+
+        self._flush_command()
+        self._opcode = opcode
+        self._repeats = 0
+
+    def _flush_command(self) -> None:
+        if self._opcode != None:
+            self._write_varint(self._repeats << _OPCODE_BITS | self._opcode)
+            self._opcode = None
+
+        if len(self._buffer) >= 1 << 16:
+            self._written += len(self._buffer)
+            self._output.write(self._buffer)
+            self._buffer = bytearray()
+
+    def _write_varint(self, value: int) -> None:
+        _write_varint(self._buffer, value)
+
+class GameLogReader:
+    def __init__(self, data):
+        """
+        Reads a binary log from any bytes-like data. A log that
+        was never closed is read up to its last whole record,
+        finding its keyframes by going through all of it.
+        """
+        self._data = data
+        if bytes(data[:len(MAGIC)]) != MAGIC or len(data) <= len(MAGIC) or not 1 <= data[len(MAGIC)] <= VERSION:
+            raise GameLogError('not a game log')
+
+        offset = len(MAGIC) + 1
+        rows, offset = _read_varint(data, offset)
+        width, offset = _read_varint(data, offset)
+        self._interval, offset = _read_varint(data, offset)
+        self._size = columns.Size(rows, width)
+
+        if bytes(data[-len(MAGIC):]) == MAGIC and len(data) >= offset + 8 + len(MAGIC):
+            self._read_index(int.from_bytes(data[-8 - len(MAGIC):-len(MAGIC)], 'little'))
+        else:
+            self._scan(offset)
+
+    def size(self) -> columns.Size:
+        return self._size
+
+    def ticks(self) -> int:
+        return self._ticks
+
+    def keyframes(self) -> [int]:
+        return [tick for tick, offset in self._keyframes]
+
+    def seek(self, tick: int) -> columns.GameState:
+        """
+        Returns a new game state as it was just after the given
+        number of ticks, or at the end of the log if the game
+        ended first. Starts from the nearest earlier keyframe,
+        so no more than the keyframe interval is replayed.
+        """
+        if not 0 <= tick <= self._ticks:
+            raise IndexError(f'tick {tick} is not in a log of {self._ticks} ticks')
+
+        start, offset = self._keyframes[bisect.bisect_right(self._keyframes, (tick + 1,)) - 1]
+        ticks, snapshot, offset = _read_keyframe(self._data, offset, self._size)
+
+        game = columns.GameState(self._size)
+        game.restore(snapshot)
+
+        try:
+            self._replay(game, offset, tick - start)
+        except columns.GameOverError:
+            pass
+
+        return game
+
+    def _replay(self, game: columns.GameState, offset: int, ticks: int) -> None:
+        """
+        Applies the commands from the given offset to
+        the game until the given number of ticks has passed.
+        """
+        data = self._data
+        while ticks > 0 and offset < len(data):
+            record, offset = _read_varint(data, offset)
+            opcode, repeats = record & _OPCODE_MASK, (record >> _OPCODE_BITS) + 1
+
+            if opcode == _TICK:
+                for _ in range(min(repeats, ticks)):
+                    ticks -= 1
+                    game.tick()
+            elif opcode == _ROTATE:
+                for _ in range(repeats):
+                    game.rotate_faller()
+            elif opcode == _LEFT or opcode == _RIGHT:
+                for _ in range(repeats):
+                    try:
+                        game.move_faller(-1 if opcode == _LEFT else 1)
+                    except columns.InvalidMoveError:
+                        pass
+            elif opcode == _DROP:
+                for _ in range(repeats):
+                    game.hard_drop()
+            elif opcode == _FALLER:
+                column, offset = _read_varint(data, offset)
+                count, offset = _read_varint(data, offset)
+                pieces = ''.join(_CELL_STRINGS[columns.with_state(code, columns.FROZEN)][1] for code in data[offset:offset + count])
+                offset += count
+                game.new_faller(columns.Faller(column, pieces))
+            elif opcode == _KEYFRAME:
+                tick, snapshot, offset = _read_keyframe(data, offset, self._size)
+                if record >> _OPCODE_BITS == _RESTORED:
+                    game.restore(snapshot)
+            else:
+                break
+
+    def _read_index(self, offset: int) -> None:
+        data = self._data
+        self._ticks, offset = _read_varint(data, offset)
+        count, offset = _read_varint(data, offset)
+
+        self._keyframes = []
+        for _ in range(count):
+            tick, offset = _read_varint(data, offset)
+            start, offset = _read_varint(data, offset)
+            self._keyframes.append((tick, start))
+
+    def _scan(self, offset: int) -> None:
+        """
+        Finds the keyframes and counts the ticks of a log
+        without an index, stopping at its last whole record.
+        """
+        data = self._data
+        self._keyframes = [(0, offset)]
+        self._ticks = 0
+
+        try:
+            offset = _read_keyframe(data, offset, self._size)[2]
+            while offset < len(data):
+                start = offset
+                record, offset = _read_varint(data, offset)
+                opcode = record & _OPCODE_MASK
+
+                if opcode == _TICK:
+                    self._ticks += (record >> _OPCODE_BITS) + 1
+                elif opcode == _FALLER:
+                    column, offset = _read_varint(data, offset)
+                    count, offset = _read_varint(data, offset)
+                    if offset + count > len(data):
+                        break
+                    offset += count
+                elif opcode == _KEYFRAME:
+                    tick, snapshot, offset = _read_keyframe(data, offset, self._size)
+                    if record >> _OPCODE_BITS != _RESTORED:
+                        self._keyframes.append((tick, start + 1))
+                elif opcode == _END:
+                    break
+        except GameLogError:
+            pass
+
+def run() -> None:
+    """
+    Records a project4 script as a binary log, or
+    shows the board of a log at any tick.
+    """
+    import batch
+    import project4
+
+    parser = argparse.ArgumentParser(description='Records and replays binary Columns logs.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help='play a script and record it as a log')
+    record.add_argument('script', help='file holding the field setup and commands, as typed into project4')
+    record.add_argument('log', help='file to write the log to')
+    record.add_argument('-i', '--interval', type=int, default=256, help='ticks between keyframes (default: 256)')
+    show = commands.add_parser('show', help='show the board of a log at a tick')
+    show.add_argument('log', help='file holding the log')
+    show.add_argument('-t', '--tick', type=int, help='tick to show (default: the last)')
+    arguments = parser.parse_args()
+
+    if arguments.command == 'record':
+        with open(arguments.script) as script:
+            field, lines = batch.read_script(script.read().splitlines())
+
+        game = columns.GameState(field)
+        game.fall()
+        game.find_matches()
+
+        with open(arguments.log, 'wb') as output:
+            writer = GameLogWriter(output, game, arguments.interval)
+            game.record(writer)
+            for line in lines:
+                try:
+                    if not project4.apply_command(game, line):
+                        break
+                except columns.GameOverError:
+                    break
+            writer.close()
+
+        print(f'{writer.ticks()} ticks recorded')
+    else:
+        with open(arguments.log, 'rb') as log:
+            reader = GameLogReader(log.read())
+
+        sys.stdout.write(project4.render_field(reader.seek(reader.ticks() if arguments.tick == None else arguments.tick)))
+
+if __name__ == "__main__":
+    run()
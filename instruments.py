@@ -0,0 +1,73 @@
+# Alexander Gottuso 87747555
+
+import time
+
+class Instruments:
+    def __init__(self, clock = time.perf_counter):
+        """
+        Collects per-phase timings and counters from any game state
+        it is attached to with instrument(). Hooks added to it are
+        called with the phase name and 'start' or 'end' as each
+        phase of the engine begins and finishes.
+        """
+        self._clock = clock
+        self._hooks = []
+        self._started = {}
+        self._timings = {}
+        self._counters = {}
+
+    def add_hook(self, hook) -> None:
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook) -> None:
+        self._hooks.remove(hook)
+
+    def start(self, phase: str) -> None:
+        for hook in self._hooks:
+            hook(phase, 'start')
+
+        self._started[phase] = self._clock()
+
+    def end(self, phase: str) -> None:
+        elapsed = self._clock() - self._started.pop(phase)
+
+        timing = self._timings.get(phase)
+        if timing == None:
+            self._timings[phase] = [1, elapsed]
+        else:
+            timing[0] += 1
+            timing[1] += elapsed
+
+        for hook in self._hooks:
+            hook(phase, 'end')
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def timings(self) -> {str: (int, float)}:
+        """
+        Returns the number of times each phase ran
+        and the total seconds spent in it.
+        """
+        return {phase: tuple(timing) for phase, timing in self._timings.items()}
+
+    def counters(self) -> {str: int}:
+        return dict(self._counters)
+
+    def reset(self) -> None:
+        self._timings.clear()
+        self._counters.clear()
+
+    def report(self) -> str:
+        """
+        Returns a table of the timings of every phase,
+        slowest first, followed by every counter.
+        """
+        lines = [f'{"phase":<12}{"calls":>10}{"total ms":>12}{"mean us":>12}']
+        for phase, (calls, seconds) in sorted(self._timings.items(), key = lambda item: -item[1][1]):
+            lines.append(f'{phase:<12}{calls:>10}{seconds * 1e3:>12.3f}{seconds / calls * 1e6:>12.3f}')
+
+        for counter, amount in sorted(self._counters.items()):
+            lines.append(f'{counter:<22}{amount:>12}')
+
+        return '\n'.join(lines)
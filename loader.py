@@ -0,0 +1,77 @@
+# Alexander Gottuso 87747555
+
+import mmap
+from columns import *
+from compact import CompactGameState, _FROZEN
+
+_INVALID = 0xFF
+
+# turns the letters of a board file into frozen compact cells
+_LOAD = bytes(_FROZEN | color_code(chr(byte)) if ord('A') <= byte <= ord('Z')
+    else EMPTY if byte == ord(' ') else _INVALID for byte in range(256))
+
+def _line(data, offset: int) -> (bytes, int):
+    """
+    Returns the line at the given offset of the data without
+    its line break, and the offset of the line after it.
+    """
+    end = data.find(b'\n', offset)
+    if end == -1:
+        end = len(data)
+
+    return bytes(data[offset:end]).rstrip(b'\r'), end + 1
+
+def read_field(data, full_scan: bool = False) -> CompactGameState:
+    """
+    Given a board in the same format that project4 reads from
+    the user, as any bytes-like data, returns a new compact game
+    state holding it. Each column is copied straight out of the
+    data, so no string is made for any row. Anything after the
+    board is ignored.
+    """
+    rows, offset = _line(data, 0)
+    columns, offset = _line(data, offset)
+    contents, offset = _line(data, offset)
+    size = Size(int(rows), int(columns))
+
+    game = CompactGameState(size, full_scan)
+    if contents.strip().upper() == b'EMPTY':
+        return game
+
+    # when every row has all its cells, the rows are a fixed
+    # stride apart and a column is every stride-th byte
+    first, after = _line(data, offset)
+    stride = after - offset
+    end = offset + size.rows * stride
+    if len(first) == size.columns and end <= len(data) \
+        and data[offset + stride - 1:end:stride] == b'\n' * size.rows:
+
+        board, start = data, offset
+    else:
+        # trailing spaces are easily lost from board files,
+        # so short rows are padded into a board of their own
+        board, start, stride = bytearray(b' ' * size.rows * size.columns), 0, size.columns
+        for row in range(size.rows):
+            if offset >= len(data):
+                raise ValueError(f'board has {row} of its {size.rows} rows')
+
+            line, offset = _line(data, offset)
+            board[row * stride:row * stride + min(len(line), stride)] = line[:stride]
+
+    cells = game.cells()
+    for column in range(size.columns):
+        codes = board[start + column:start + size.rows * stride:stride].translate(_LOAD)
+        if _INVALID in codes:
+            raise ValueError(f'column {column + 1} holds something other than a jewel')
+
+        cells[column * size.rows:(column + 1) * size.rows] = codes
+
+    return game
+
+def load_field(path: str, full_scan: bool = False) -> CompactGameState:
+    """
+    Memory-maps the board file at the given path and
+    returns a new compact game state holding its board.
+    """
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as data:
+        return read_field(data, full_scan)
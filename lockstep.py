@@ -0,0 +1,427 @@
+# Alexander Gottuso 87747555
+
+from columns import *
+from compact import CompactGameState, _CLEAR_MATCHED, _mark_matched
+
+_IS_MATCHED = bytes(1 if cell_state(code) == MATCHED else 0 for code in range(256))
+_IS_FROZEN = bytes(1 if cell_state(code) == FROZEN else 0 for code in range(256))
+_IS_OCCUPIED = bytes(0 if code == EMPTY else 1 for code in range(256))
+
+# sets the state of a whole faller's pieces at once
+_WITH_STATE = {state: bytes(with_state(code, state) for code in range(256)) for state in (FALLING, LANDED, FROZEN)}
+
+class Lockstep:
+    def __init__(self, size: Size, games: [CompactGameState] = ()):
+        """
+        Holds any number of games on boards of the given size,
+        stacked one after another in a single bytearray, so that
+        one search finds the matches of all of them. Every column
+        is followed by an empty cell and every board by an empty
+        column, so that no run of jewels reaches the next column
+        or the next board.
+        Every game behaves exactly as a CompactGameState would.
+        """
+        self._size = size
+        self._column_stride = size.rows + 1
+        self._stride = (size.columns + 1) * self._column_stride
+        self._cells = bytearray()
+
+        # the current faller of every game, kept in the same
+        # form as CompactGameState keeps it
+        self._fallers = []
+        self._columns = []
+        self._rows = []
+        self._pieces = []
+        self._states = []
+        self._over = bytearray()
+
+        for game in games:
+            self.add(game)
+
+    def __len__(self) -> int:
+        return len(self._fallers)
+
+    def size(self) -> Size:
+        return self._size
+
+    def add(self, game: CompactGameState) -> int:
+        """
+        Adds a copy of the given game, returning its index.
+        """
+        if game.size() != self._size:
+            raise ValueError(f'game of size {game.size()} cannot join games of size {self._size}')
+
+        self._cells += bytes(self._stride)
+        self._fallers.append(None)
+        self._columns.append(0)
+        self._rows.append(-1)
+        self._pieces.append(bytearray())
+        self._states.append(FALLING)
+        self._over.append(0)
+
+        self._load(len(self._fallers) - 1, game.snapshot())
+        return len(self._fallers) - 1
+
+    def game(self, index: int) -> CompactGameState:
+        """
+        Returns a copy of the game at the given index.
+        """
+        rows = self._size.rows
+        start = index * self._stride
+        cells = b''.join(self._cells[start + column * self._column_stride:start + column * self._column_stride + rows]
+            for column in range(self._size.columns))
+
+        game = CompactGameState(self._size, full_scan = True)
+        game.restore((cells, self._fallers[index], self._columns[index], self._rows[index],
+            tuple(self._pieces[index]), self._states[index], None, None))
+        return game
+
+    def game_over(self, index: int) -> bool:
+        return self._over[index] == 1
+
+    def new_faller(self, index: int, faller: Faller) -> bool:
+        """
+        Gives the game at the given index a new faller,
+        returning False if that ended the game.
+        """
+        column = faller.position().column
+        if not -self._size.columns <= column < self._size.columns:
+            raise IndexError('column index out of range')
+
+        self._fallers[index] = faller
+        self._columns[index] = column
+        self._rows[index] = faller.position().row
+        self._pieces[index] = bytearray(cell_code(piece) for piece in faller.pieces())
+        self._states[index] = faller._state
+
+        if _IS_FROZEN[self._cells[self._base(index)]]:
+            self._over[index] = 1
+            return False
+
+        self._fall(index)
+        return True
+
+    def move_faller(self, index: int, direction: int) -> None:
+        self._apply(index, lambda game: game.move_faller(direction))
+
+    def rotate_faller(self, index: int) -> None:
+        self._apply(index, lambda game: game.rotate_faller())
+
+    def tick(self) -> bytearray:
+        """
+        Ticks every game that has not ended, returning the
+        events of each one as a byte of *_EVENT bits.
+        Clearing matched jewels, gravity and the search for
+        matches are each done for all games together. Each
+        faller falls and freezes one game at a time.
+        """
+        stride = self._stride
+        cells = self._cells
+        events = bytearray(len(self._fallers))
+
+        # games with matched jewels have them cleared this tick,
+        # unless they have already ended
+        cascading = set()
+        ended = []
+        matched = cells.translate(_IS_MATCHED)
+        position = matched.find(1)
+        while position != -1:
+            if self._over[position // stride]:
+                ended.append(position // stride)
+            else:
+                cascading.add(position // stride)
+            position = matched.find(1, (position // stride + 1) * stride)
+
+        if cascading:
+            self._clear(sorted(cascading), ended)
+            for index in cascading:
+                events[index] |= CLEARED_EVENT
+
+        scanned = []
+        for index in range(len(self._fallers)):
+            if self._over[index] or index in cascading:
+                continue
+
+            state = self._states[index]
+            if self._fallers[index] == None:
+                scanned.append(index)
+            elif state == LANDED:
+                self._pieces[index] = self._pieces[index].translate(_WITH_STATE[FROZEN])
+                self._states[index] = FROZEN
+                self._write_faller(index)
+                events[index] |= FROZEN_EVENT
+            elif state == FROZEN:
+                if self._rows[index] < len(self._pieces[index]) - 1:
+                    # the faller is partly above the board, which
+                    # only happens once just before the game ends
+                    events[index] |= self._apply(index, lambda game: game.tick())
+                else:
+                    scanned.append(index)
+            elif self._fall(index):
+                events[index] |= LANDED_EVENT
+
+        if scanned:
+            self._find_matches(scanned, events)
+
+        return events
+
+    def _find_matches(self, scanned: [int], events: bytearray) -> None:
+        """
+        Searches the boards of the given games for matches all
+        at once, marking them as find_matches() would.
+        """
+        rows = self._size.rows
+        stride = self._stride
+        cells = self._cells
+        if len(scanned) == len(self._fallers):
+            mask = padded_match_mask(bytes(cells), rows)
+        else:
+            mask = padded_match_mask(b''.join(cells[index * stride:(index + 1) * stride] for index in scanned), rows)
+
+        position = mask.find(1)
+        while position != -1:
+            found = position // stride
+            index = scanned[found]
+            start = index * stride
+
+            marked = _mark_matched(cells[start:start + stride], mask[found * stride:(found + 1) * stride])
+            cells[start:start + stride] = marked
+            events[index] |= MATCHED_EVENT
+
+            if self._fallers[index] != None:
+                pieces = self._pieces[index]
+                base = self._base(index) - start
+                for piece in range(len(pieces)):
+                    row = self._rows[index] - (len(pieces) - 1) + piece
+                    pieces[piece] = marked[base + (row + rows if row < 0 else row)]
+
+            position = mask.find(1, (found + 1) * stride)
+
+        # a frozen faller that fits with nothing matched means
+        # the game goes on, so there is nothing more to check here
+
+    def _clear(self, cascading: [int], ended: [int]) -> None:
+        """
+        Clears the matched jewels of the given games, drops their
+        fallers past them and has every piece of their boards
+        fall, as CompactGameState does when it ticks. The boards
+        of games that have ended are left as they are.
+        """
+        stride = self._stride
+        cells = self._cells
+        cleared = cells.translate(_CLEAR_MATCHED)
+        for index in ended:
+            cleared[index * stride:(index + 1) * stride] = cells[index * stride:(index + 1) * stride]
+        cells[:] = cleared
+
+        for index in cascading:
+            if self._fallers[index] != None:
+                self._faller_tick(index) # removes matched pieces
+                self._drop(index)
+                self._faller_tick(index) # freezes remaining pieces
+                self._write_faller(index)
+
+        if len(cascading) == len(self._fallers):
+            cells[:] = self._settle(cells)
+        else:
+            settled = self._settle(b''.join(cells[index * stride:(index + 1) * stride] for index in cascading))
+            for found, index in enumerate(cascading):
+                cells[index * stride:(index + 1) * stride] = settled[found * stride:(found + 1) * stride]
+
+    def _settle(self, boards: bytes) -> bytes:
+        """
+        Returns the given boards, laid out as the stacked board
+        is, with every piece fallen as far as it can go. Each
+        cell is a byte of one big integer, with the cells below
+        it at higher bytes, and a piece moves down by as many
+        rows as there are empty cells below it, one bit of that
+        distance at a time for every column at once, as
+        BitboardGameState.fall() does with one bit per cell.
+        """
+        rows = self._size.rows
+        column_stride = self._column_stride
+        count = len(boards) // column_stride
+
+        # a byte of 1 for every cell of the board, and for each
+        # shift used, for the cells that it moves within a column
+        inner = int.from_bytes((b'\1' * rows + b'\0') * count, 'little')
+        occupied = int.from_bytes(boards.translate(_IS_OCCUPIED), 'little')
+        below = (inner & ~occupied) >> 8 & inner
+        if not occupied & below:
+            return boards
+
+        within = []
+        step = 1
+        while step < rows:
+            within.append(int.from_bytes((b'\1' * (column_stride - step) + bytes(step)) * count, 'little'))
+            step <<= 1
+
+        value = int.from_bytes(boards, 'little')
+        distance = 1
+        while distance < rows:
+            # each cell learns whether the number of empty cells
+            # below it is odd, which is the next bit of how far
+            # its piece falls; no shift reaches the next column
+            parity = below
+            step = 1
+            for mask in within:
+                parity ^= parity >> 8 * step & mask
+                step <<= 1
+
+            moving = occupied & parity
+            if moving:
+                pieces = value & moving * 0xFF
+                value = value ^ pieces | pieces << 8 * distance
+                occupied = occupied ^ moving | moving << 8 * distance
+
+            below &= ~parity
+            distance <<= 1
+
+        return value.to_bytes(len(boards), 'little')
+
+    def _faller_tick(self, index: int) -> None:
+        """
+        Removes the matched pieces of the given game's faller
+        and freezes it if it has landed, as CompactGameState does.
+        """
+        pieces = self._pieces[index]
+        count = len(pieces)
+        last_matched = count > 0 and cell_state(pieces[-1]) == MATCHED
+        pieces = bytearray(piece for piece in pieces if cell_state(piece) != MATCHED)
+
+        if pieces and last_matched:
+            self._rows[index] -= count - len(pieces)
+
+        if not pieces or self._states[index] == LANDED:
+            pieces = pieces.translate(_WITH_STATE[FROZEN])
+            self._states[index] = FROZEN
+
+        self._pieces[index] = pieces
+
+    def _drop(self, index: int) -> None:
+        """
+        Has the faller of the given game fall as far as it can,
+        as CompactGameState does once matched jewels are cleared.
+        """
+        rows = self._size.rows
+        cells = self._cells
+        count = len(self._pieces[index])
+        base = self._base(index)
+
+        for row in range(self._rows[index] + 1, rows):
+            if self._cell(index, row) == EMPTY:
+                self._rows[index] = row
+                self._write_faller(index)
+                if row - count >= 0:
+                    cells[base + row - count] = EMPTY
+
+        self._land(index)
+
+    def _fall(self, index: int) -> bool:
+        """
+        Has the faller of the given game fall by one row
+        as CompactGameState does, returning True if it landed.
+        """
+        rows = self._size.rows
+        cells = self._cells
+        count = len(self._pieces[index])
+        base = self._base(index)
+        row = self._rows[index] + 1
+
+        if row < rows and cells[base + row] == EMPTY:
+            self._rows[index] = row
+            self._write_faller(index)
+            if row - count >= 0:
+                cells[base + row - count] = EMPTY
+
+        return self._land(index)
+
+    def _land(self, index: int) -> bool:
+        """
+        Updates whether the faller of the given game has landed,
+        as CompactGameState does, returning True if it has.
+        """
+        state = self._states[index]
+        if state == FROZEN:
+            return False
+
+        row = self._rows[index]
+        was_landed = state == LANDED
+        state = LANDED if row == self._size.rows - 1 or _IS_FROZEN[self._cell(index, row + 1)] else FALLING
+
+        self._states[index] = state
+        self._pieces[index] = self._pieces[index].translate(_WITH_STATE[state])
+
+        if (state == LANDED) != was_landed:
+            self._write_faller(index)
+
+        return state == LANDED
+
+    def _write_faller(self, index: int) -> None:
+        """
+        Writes the pieces of the given game's faller into its column.
+        """
+        base = self._base(index)
+        pieces = self._pieces[index]
+        row = self._rows[index]
+        top = row - len(pieces) + 1
+        if top >= 0:
+            self._cells[base + top:base + row + 1] = pieces
+        elif row >= 0:
+            self._cells[base:base + row + 1] = pieces[-top:]
+
+    def _cell(self, index: int, row: int) -> int:
+        """
+        Returns the code at the given row of the column holding
+        the given game's faller. A negative row is read from the
+        compact board as CompactGameState would read it, which
+        reaches into the column before, or the last column.
+        """
+        if row >= 0:
+            return self._cells[self._base(index) + row]
+
+        rows = self._size.rows
+        offset = (self._columns[index] % self._size.columns * rows + row) % (rows * self._size.columns)
+        return self._cells[index * self._stride + offset // rows * self._column_stride + offset % rows]
+
+    def _base(self, index: int) -> int:
+        """
+        Returns the offset of the column holding the given game's faller.
+        """
+        return index * self._stride + self._columns[index] % self._size.columns * self._column_stride
+
+    def _apply(self, index: int, change) -> int:
+        """
+        Makes a CompactGameState of the given game, changes it with
+        the given function and stores it back, returning the events
+        that can be told from the result. Any other error is raised
+        once the game is stored back, since a blocked move may
+        already have changed it.
+        """
+        game = self.game(index)
+        events = 0
+        try:
+            change(game)
+        except GameOverError:
+            self._over[index] = 1
+            events |= GAME_OVER_EVENT
+        finally:
+            self._load(index, game.snapshot())
+
+        if 1 in self._cells[index * self._stride:(index + 1) * self._stride].translate(_IS_MATCHED):
+            events |= MATCHED_EVENT
+
+        return events
+
+    def _load(self, index: int, snapshot: tuple) -> None:
+        cells, faller, column, row, pieces, state = snapshot[:6]
+        rows = self._size.rows
+        for column_index in range(self._size.columns):
+            start = index * self._stride + column_index * self._column_stride
+            self._cells[start:start + rows] = cells[column_index * rows:(column_index + 1) * rows]
+
+        self._fallers[index] = faller
+        self._columns[index] = column
+        self._rows[index] = row
+        self._pieces[index] = bytearray(pieces)
+        self._states[index] = state
@@ -1,23 +1,89 @@
 # Alexander Gottuso 87747555
 
+from collections import namedtuple
+import codecs
+import io
+import sys
 import columns
 
-def _get_board_size() -> columns.Size:
+Command = namedtuple('Command', ('action', 'column', 'pieces'))
+
+def read_lines(stream = None, chunk_size: int = 1 << 16):
+    """
+    Yields each line of the given stream, standard input
+    by default, without its line break. A terminal is read
+    a line at a time as it is typed; anything else is read in
+    chunks of up to chunk_size, each taken as soon as any of it
+    is available, so that a program typing one line at a time
+    is still answered.
+    """
+    stream = stream if stream != None else sys.stdin
+    if stream.isatty():
+        for line in iter(stream.readline, ''):
+            yield line[:-1] if line.endswith('\n') else line
+        return
+
+    buffer = getattr(stream, 'buffer', None)
+    if buffer != None:
+        read = buffer.read1
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(stream.encoding or 'utf-8')(), True)
+    else:
+        read = stream.read
+        decoder = None
+
+    pending = ''
+    while True:
+        chunk = read(chunk_size)
+        text = chunk if decoder == None else decoder.decode(chunk, not chunk)
+
+        lines = (pending + text).split('\n')
+        pending = lines.pop()
+        yield from lines
+
+        if not chunk:
+            break
+
+    if pending:
+        yield pending
+
+_SIMPLE_COMMANDS = {action: Command(action, None, None) for action in ('', 'R', '<', '>', 'Q')}
+_IGNORED = Command(None, None, None)
+
+def parse_command(line: str) -> Command:
+    """
+    Given a line typed by the user, returns the command it
+    stands for. Lines that are not commands are ignored.
+    """
+    if 'F' in line:
+        faller = line.split(' ')
+        return Command('F', int(faller[1]) - 1, ''.join(faller[2:]))
+
+    return _SIMPLE_COMMANDS.get(line, _IGNORED)
+
+def parse_commands(lines):
+    """
+    Given an iterable of lines, yields the command
+    each of them stands for as it is needed.
+    """
+    for line in lines:
+        yield parse_command(line)
+
+def _get_board_size(lines) -> columns.Size:
     """
     Asks the user for the size of the board,
     in terms of rows and columns.
     """
     def get_rows() -> int:
-        rows = input()
+        rows = next(lines)
         return int(rows)
     
     def get_columns() -> int:
-        columns = input()
+        columns = next(lines)
         return int(columns)
     
     return columns.Size(get_rows(), get_columns())
 
-def _get_field(size: columns.Size) -> columns.Size or [str]:
+def _get_field(size: columns.Size, lines) -> columns.Size or [str]:
     """
     Gets the initial layout of the board;
     returns None if empty, or otherwise its
@@ -25,83 +91,121 @@ def _get_field(size: columns.Size) -> columns.Size or [str]:
     """
     result = []
 
-    type = input().strip()
+    type = next(lines).strip()
     if type.upper() == 'EMPTY':
         return size
     else:
         for _ in range(size.rows):
-            result.append(input())
+            result.append(next(lines))
 
     return result
 
+def render_field(field: columns.GameState) -> str:
+    """
+    Given the current state of the game, returns
+    the whole frame that displays its field.
+    """
+    return field.field().render()
+
 def display_field(field: columns.GameState) -> None:
     """
     Given the current state of the game,
     displays the field.
     """
-    for row in range(field.size().rows):
-        start = True
-        for column in field.field():
-            if start:
-                print('|', end='')
-                start = False
-            print(column[row], end='')
-        else:
-            print('|')
-    else:
-        print(' ' + '-' * 3 * field.size().columns, end=' \n')
+    sys.stdout.write(render_field(field))
+
+class FrameWriter:
+    def __init__(self, output = None, diff: bool = False):
+        """
+        Writes frames of a game to the given output, which is
+        standard output by default. In diff mode, only the rows
+        that changed since the last frame are rewritten in place
+        using terminal cursor movement, so nothing else should be
+        written to the output between frames.
+        """
+        self._output = output
+        self._diff = diff
+        self._rows = None
+
+    def write(self, field: columns.GameState) -> None:
+        """
+        Writes the frame for the given game with a single write.
+        """
+        output = self._output if self._output != None else sys.stdout
+        frame = render_field(field)
+        rows = frame.splitlines(True)
+
+        if self._diff and self._rows != None and len(rows) == len(self._rows):
+            # the cursor sits just below the last frame, so each
+            # changed row is reached by moving up and back down
+            changes = []
+            for row in range(len(rows)):
+                if rows[row] != self._rows[row]:
+                    changes.append(f'\x1b[{len(rows) - row}F{rows[row][:-1]}\x1b[{len(rows) - row}E')
+            frame = ''.join(changes)
 
-def _get_new_faller(line: str) -> columns.Faller:
-    faller = line.split(' ')
-    column = int(faller[1]) - 1
-    pieces = ''.join(faller[2:])
-    return columns.Faller(column, pieces)
+        self._rows = rows
+        if frame:
+            output.write(frame)
+            output.flush()
 
-def _find_command(game: columns.GameState) -> None:
+def execute(game: columns.GameState, command: Command) -> bool:
     """
-    Once the field is set, looks for the format
-    of the command that the user has entered,
-    and affects the given game state accordingly.
+    Affects the given game state according to a single
+    parsed command, returning False if the command was to quit.
     """
-    command = input()
-    if command == '':
+    action = command.action
+    if action == '':
         game.tick()
-    elif 'F' in command:
-        faller = _get_new_faller(command)
-        game.new_faller(faller)
-    elif command == 'R':
+    elif action == 'F':
+        game.new_faller(columns.Faller(command.column, command.pieces))
+    elif action == 'R':
+        game.rotate_faller()
+    elif action == '<' or action == '>':
         try:
-            game.faller().rotate(game.field()[game.faller().position().column])
-        except AttributeError:
-            pass
-    elif command == '<' or command == '>':
-        try:
-            game.move_faller(-1 if command == '<' else 1)
+            game.move_faller(-1 if action == '<' else 1)
         except AttributeError:
             pass
         except columns.InvalidMoveError:
             pass
-    elif command == 'Q':
-        quit()
+    elif action == 'Q':
+        return False
 
-def run() -> None:
+    return True
+
+def apply_command(game: columns.GameState, command: str) -> bool:
+    """
+    Affects the given game state according to a single
+    command, returning False if the command was to quit.
+    """
+    return execute(game, parse_command(command))
+
+def run(stream = None) -> None:
     """
     Runs the user interface in order to
-    play Columns.
+    play Columns, reading from the given
+    stream or standard input.
     """
-    size = _get_board_size()
-    field = _get_field(size)
+    lines = read_lines(stream)
+    size = _get_board_size(lines)
+    field = _get_field(size, lines)
     game = columns.GameState(field)
     game.fall()
     game.find_matches()
+    frames = FrameWriter()
 
-    while True:
+    # each frame is written before the next command is read,
+    # so that the user sees the board they are answering
+    frames.write(game)
+    for command in parse_commands(lines):
         try:
-            display_field(game)
-            _find_command(game)
+            if not execute(game, command):
+                break
         except columns.GameOverError:
             print('GAME OVER')
             break
 
+        frames.write(game)
+
 if __name__ == "__main__":
     run()
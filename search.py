@@ -0,0 +1,215 @@
+# Alexander Gottuso 87747555
+
+from collections import namedtuple
+import time
+from columns import *
+
+Placement = namedtuple('Placement', ('column', 'rotations'))
+SearchResult = namedtuple('SearchResult', ('placement', 'score', 'depth', 'nodes'))
+
+CLEAR_WEIGHT = 10.0
+GAME_OVER = float('-inf')
+
+class _OutOfTime(Exception):
+    pass
+
+def evaluate_board(game) -> float:
+    """
+    Scores a settled board, where higher is better.
+    Every jewel counts against it, jewels in the tallest column
+    even more so, and each pair of touching jewels of the same
+    color counts for it since they are part of the way to a match.
+    """
+    field = game.field().to_lists()
+    heights = [sum(cell != '   ' for cell in column) for column in field]
+
+    pairs = 0
+    for column in range(len(field)):
+        for row in range(len(field[column])):
+            cell = field[column][row]
+            if cell != '   ':
+                if row + 1 < len(field[column]) and field[column][row + 1] == cell:
+                    pairs += 1
+                if column + 1 < len(field) and field[column + 1][row] == cell:
+                    pairs += 1
+
+    return pairs - sum(heights) - 4 * max(heights)
+
+def placements(faller: Faller, columns: int) -> [Placement]:
+    """
+    Returns every column and number of rotations the given faller
+    could be dropped with, nearest columns first, leaving out
+    rotations that would give the same order of pieces.
+    """
+    start = faller.position().column
+    pieces = faller.pieces()
+
+    orders = []
+    for rotations in range(max(1, len(pieces))):
+        order = pieces[len(pieces) - rotations:] + pieces[:len(pieces) - rotations]
+        if order not in orders:
+            orders.append(order)
+
+    return [Placement(column, rotations) for column in sorted(range(columns), key = lambda column: abs(column - start))
+        for rotations in range(len(orders))]
+
+def describe(faller: Faller) -> (int, str):
+    """
+    Returns the column of the given faller and the
+    letters of its pieces, from which it can be rebuilt.
+    """
+    return faller.position().column, ''.join(piece[1] for piece in faller.pieces())
+
+def place(game, faller: Faller, placement: Placement):
+    """
+    Given a game, returns a clone of it after the faller has been
+    rotated, moved to the placement's column and has settled,
+    along with the number of jewels cleared on the way, or None
+    if the game ended. Raises InvalidMoveError if the placement
+    cannot be reached.
+    """
+    child = game.clone()
+    column, pieces = describe(faller)
+
+    try:
+        child.new_faller(Faller(column, pieces))
+        for _ in range(placement.rotations):
+            child.rotate_faller()
+
+        # moving a faller that is partly above the board
+        # would wrap its pieces around to the bottom
+        while child.faller().position().row < len(pieces) - 1 and not child.faller().landed():
+            child.tick()
+
+        direction = 1 if placement.column > column else -1
+        while child.faller().position().column != placement.column:
+            if child.faller().position().row < len(pieces) - 1:
+                raise InvalidMoveError
+
+            child.move_faller(direction)
+
+        child.hard_drop()
+        while not child.faller().frozen():
+            child.tick()
+
+        # a faller that cannot fit ends the game here
+        cleared = sum(child.resolve())
+    except GameOverError:
+        return None, 0
+
+    return child, cleared
+
+class Searcher:
+    def __init__(self, evaluate = evaluate_board, budget: float = 0.05, max_entries: int = 100000,
+        clock = time.perf_counter):
+        """
+        Searches for the best placement of each faller in a game,
+        looking as many fallers ahead as it can within the budget
+        in seconds. Given a game state whose last faller has settled,
+        evaluate scores it; cleared jewels are added to that score.
+        Boards already searched are remembered across searches
+        in a table of up to max_entries entries.
+        """
+        self._evaluate = evaluate
+        self._budget = budget
+        self._max_entries = max_entries
+        self._clock = clock
+
+        self._keys = None
+        self._table = {}
+        self._deadline = None
+        self._nodes = 0
+
+    def search(self, game, fallers: [Faller], max_depth: int = None) -> SearchResult:
+        """
+        Given a game with no faller still moving and the fallers that
+        will enter it next, returns the best placement for the first
+        of them. Each pass searches one more faller ahead, and the
+        result of the deepest finished pass is returned. If the budget
+        runs out during the first pass, the best placement found so far
+        is returned with a depth of 0.
+        """
+        if self._keys == None or self._keys.size() != game.size():
+            self._keys = ZobristKeys(game.size())
+            self._table.clear()
+        elif len(self._table) > self._max_entries:
+            self._table.clear()
+
+        self._deadline = self._clock() + self._budget
+        self._nodes = 0
+
+        upcoming = tuple(describe(faller) for faller in fallers)
+        depth = len(fallers) if max_depth == None else min(max_depth, len(fallers))
+
+        result = None
+        for ahead in range(1, depth + 1):
+            try:
+                score, placement, finished = self._search(game, fallers, upcoming, 0, ahead, result == None)
+            except _OutOfTime:
+                break
+
+            result = SearchResult(placement, score, ahead if finished else 0, self._nodes)
+            if not finished:
+                break
+
+        if result != None:
+            result = result._replace(nodes = self._nodes)
+
+        return result
+
+    def _search(self, game, fallers: [Faller], upcoming: tuple, ply: int, ahead: int, partial: bool) -> (float, Placement, bool):
+        """
+        Returns the best score and placement for the faller at ply,
+        looking the given number of fallers ahead, and whether every
+        placement was searched. Only a partial search may stop early.
+        """
+        field = game.field()
+        board = self._keys.hash_field(field)
+        key = (board, upcoming[ply:ply + ahead])
+
+        entry = self._table.get(key)
+        if entry != None:
+            return entry[0], entry[1], True
+
+        # the best placement from the previous pass is tried first
+        # so that it is kept if this pass runs out of time
+        candidates = placements(fallers[ply], game.size().columns)
+        hint = self._table.get((board, upcoming[ply:ply + ahead - 1]))
+        if hint != None and hint[1] in candidates:
+            candidates.remove(hint[1])
+            candidates.insert(0, hint[1])
+
+        best = None
+
+        for placement in candidates:
+            try:
+                child, cleared = self._place(game, fallers[ply], placement, partial and best == None)
+                if child == None:
+                    score = GAME_OVER
+                elif ahead == 1:
+                    score = cleared * CLEAR_WEIGHT + self._evaluate(child)
+                else:
+                    score = cleared * CLEAR_WEIGHT + self._search(child, fallers, upcoming, ply + 1, ahead - 1, False)[0]
+            except InvalidMoveError:
+                continue
+            except _OutOfTime:
+                if partial and best != None:
+                    return best[0], best[1], False
+                raise
+
+            if best == None or score > best[0]:
+                best = (score, placement)
+
+        self._table[key] = best
+        return best[0], best[1], True
+
+    def _place(self, game, faller: Faller, placement: Placement, anyway: bool):
+        """
+        Places the faller as place() does, but unless anyway
+        is True, running out of time raises _OutOfTime first.
+        """
+        if not anyway and self._clock() > self._deadline:
+            raise _OutOfTime
+
+        self._nodes += 1
+        return place(game, faller, placement)
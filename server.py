@@ -0,0 +1,236 @@
+# Alexander Gottuso 87747555
+
+import argparse
+import asyncio
+import batch
+import columns
+import project4
+
+GAME_OVER = b'GAME OVER\n'
+
+class GameServer:
+    def __init__(self, high_water: int = 1 << 16, linger: float = 5.0):
+        """
+        Hosts any number of games at once, each played over its own
+        connection with the same lines project4 reads, and answered
+        with the same frames. Commands that arrive together are
+        applied in one batch per turn of the event loop. Once more
+        than high_water bytes of frames are waiting for a client,
+        its game stops reading commands until they are taken.
+        After a game ends, whatever else its client sends is read
+        and dropped for up to linger seconds so that closing the
+        connection does not throw away the last frames.
+        """
+        self._high_water = high_water
+        self._linger = linger
+        self._servers = []
+        self._pending = []
+        self._sessions = {}
+        self._batches = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> (str, int):
+        """
+        Starts accepting games over TCP, returning the address
+        they are accepted on, which has a free port if 0 is given.
+        """
+        # thousands of clients may connect at once, and any
+        # that do not fit in the queue have their connection reset
+        server = await asyncio.start_server(self._serve, host, port, backlog = 4096)
+        self._servers.append(server)
+        return server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path: str) -> None:
+        """
+        Starts accepting games over a Unix socket at the given path.
+        """
+        self._servers.append(await asyncio.start_unix_server(self._serve, path, backlog = 4096))
+
+    async def serve_forever(self) -> None:
+        await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+    async def close(self) -> None:
+        """
+        Stops accepting games and ends every game being played.
+        """
+        for server in self._servers:
+            server.close()
+
+        # frames still waiting for a client are dropped
+        # rather than waited for
+        for writer in self._sessions.values():
+            writer.transport.abort()
+
+        await asyncio.gather(*self._sessions, return_exceptions = True)
+        for server in self._servers:
+            await server.wait_closed()
+
+        self._servers.clear()
+
+    def sessions(self) -> int:
+        return len(self._sessions)
+
+    def batches(self) -> int:
+        return self._batches
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Plays one game with a client until it quits,
+        the game ends or the connection is closed.
+        """
+        writer.transport.set_write_buffer_limits(self._high_water)
+        task = asyncio.current_task()
+        self._sessions[task] = writer
+
+        try:
+            game = await self._new_game(reader)
+            if game == None:
+                return
+
+            frame = project4.render_field(game).encode()
+            writer.write(frame)
+
+            while frame != GAME_OVER:
+                # a client that is slow to take its frames
+                # holds up its own game and no other
+                await writer.drain()
+
+                line = await _read_line(reader)
+                if line == None:
+                    break
+
+                frame = await self._submit(game, _parse_command(line), frame)
+                if frame == None:
+                    break
+
+                writer.write(frame)
+
+            await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+                await asyncio.wait_for(_discard(reader), self._linger)
+        except (ConnectionError, ValueError, asyncio.TimeoutError):
+            pass
+        finally:
+            del self._sessions[task]
+            writer.close()
+
+    async def _new_game(self, reader: asyncio.StreamReader) -> columns.GameState:
+        """
+        Reads the size and layout of a board from the client,
+        returning the game built from it, or None if the
+        connection was closed first.
+        """
+        lines = []
+        for _ in range(3):
+            lines.append(await _read_line(reader))
+
+        if None in lines:
+            return None
+
+        if lines[2].strip().upper() != 'EMPTY':
+            for _ in range(int(lines[0])):
+                lines.append(await _read_line(reader))
+
+            if None in lines:
+                return None
+
+        field, commands = batch.read_script(lines)
+        game = columns.GameState(field)
+        game.fall()
+        game.find_matches()
+        return game
+
+    def _submit(self, game: columns.GameState, command: project4.Command, frame: bytes) -> asyncio.Future:
+        """
+        Returns a future for the frame after the given command is
+        applied to the game, which is None if it was to quit. The
+        command waits for the batch run at the next turn of the loop.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((game, command, frame, future))
+
+        if len(self._pending) == 1:
+            loop.call_soon(self._run_batch)
+
+        return future
+
+    def _run_batch(self) -> None:
+        pending, self._pending = self._pending, []
+        self._batches += 1
+
+        for game, command, frame, future in pending:
+            if future.cancelled():
+                continue
+
+            try:
+                if not project4.execute(game, command):
+                    frame = None
+                elif command.action != None:
+                    frame = project4.render_field(game).encode()
+                # lines that are not commands change nothing,
+                # so the last frame is sent again as it was
+            except columns.GameOverError:
+                frame = GAME_OVER
+            except (ValueError, IndexError):
+                # a faller outside the board is ignored
+                # as a line that is not a command would be
+                pass
+            except Exception as error:
+                future.set_exception(error)
+                continue
+
+            future.set_result(frame)
+
+def _parse_command(line: str) -> project4.Command:
+    """
+    Returns the command a client's line stands for, where
+    a line that cannot be read as one is ignored.
+    """
+    try:
+        return project4.parse_command(line)
+    except (ValueError, IndexError):
+        return project4.Command(None, None, None)
+
+async def _discard(reader: asyncio.StreamReader) -> None:
+    while await reader.read(1 << 16):
+        pass
+
+async def _read_line(reader: asyncio.StreamReader) -> str or None:
+    """
+    Returns the next line from the client without its
+    line break, or None if the connection was closed.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+
+    return line.decode().rstrip('\r\n')
+
+def run() -> None:
+    """
+    Hosts games until interrupted.
+    """
+    parser = argparse.ArgumentParser(description='Hosts many Columns games, one per connection.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to accept games on (default: 127.0.0.1)')
+    parser.add_argument('-p', '--port', type=int, default=8787, help='TCP port to accept games on (default: 8787)')
+    parser.add_argument('-u', '--unix', help='also accept games on a Unix socket at this path')
+    arguments = parser.parse_args()
+
+    async def serve() -> None:
+        server = GameServer()
+        host, port = await server.start(arguments.host, arguments.port)
+        print(f'accepting games on {host}:{port}')
+        if arguments.unix != None:
+            await server.start_unix(arguments.unix)
+            print(f'accepting games on {arguments.unix}')
+
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,41 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+from batch import *
+
+class BatchTests(test.TestCase):
+    def setUp(self):
+        self.script = ['4', '3', 'EMPTY', 'F 3 X Y Z', '', '', '', '', 'Q', '']
+
+    def test_script_is_read_like_user_input(self):
+        field, commands = read_script(self.script)
+        self.assertEqual(field, columns.Size(4, 3))
+        self.assertEqual(commands, ['F 3 X Y Z', '', '', '', '', 'Q', ''])
+
+    def test_field_rows_are_padded(self):
+        field, commands = read_script(['2', '3', 'CONTENTS', 'X', 'YZX', 'R'])
+        self.assertEqual(field, ['X  ', 'YZX'])
+        self.assertEqual(commands, ['R'])
+
+    def test_script_stops_at_quit(self):
+        replay = run_script(*read_script(self.script))
+        self.assertEqual(replay.commands, 5)
+        self.assertFalse(replay.game_over)
+        self.assertEqual(replay.game.field().to_lists()[2], ['   ', ' X ', ' Y ', ' Z '])
+
+    def test_snapshots_are_kept(self):
+        replay = run_script(*read_script(self.script), {0, 1})
+        self.assertEqual([count for count, frame in replay.snapshots], [0, 1])
+        self.assertEqual(replay.snapshots[1][1].splitlines()[0], '|      [Z]|')
+
+    def test_ticks_and_cleared_jewels_are_counted(self):
+        replay = run_script(['   ', 'XXX'], ['', 'F 1 Y Z Y', '', ''])
+        self.assertEqual((replay.ticks, replay.cleared), (3, 3))
+
+    def test_script_stops_at_game_over(self):
+        replay = run_script(['X', 'Y'], ['F 1 X Y Z', ''])
+        self.assertTrue(replay.game_over)
+        self.assertEqual(replay.commands, 1)
+
+if __name__ == "__main__":
+    test.main()
@@ -0,0 +1,88 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+import random
+from bitboard import *
+
+class BitboardGameStateTests(test.TestCase):
+    def setUp(self):
+        self.rows = ['    ', '    ', 'X   ', 'Y Z ', 'YXZW', 'ZYXW']
+
+    def test_field_matches_compact_game_state(self):
+        game = BitboardGameState(self.rows)
+        self.assertEqual(game.field(), CompactGameState(self.rows).field())
+        self.assertEqual(game.cells(), CompactGameState(self.rows).cells())
+
+    def test_pieces_keep_their_order_when_falling(self):
+        game = BitboardGameState(['A ', 'B ', '  ', 'C ', '  '])
+        self.assertEqual(game.fall(), [0])
+        self.assertEqual(game.field().to_lists()[0], ['   ', '   ', ' A ', ' B ', ' C '])
+        self.assertEqual(game.fall(), [])
+
+    def test_runs_are_found_along_every_axis(self):
+        game = BitboardGameState(\
+            ['XYZ ',
+            'YXY ',
+            'ZYXZ',
+            'ZZZY'])
+        self.assertTrue(game.find_matches())
+        self.assertEqual([''.join('*' if cell[0] == '*' else '.' for cell in row) for row in game.field().rows()],
+            ['*...', '.*..', '..*.', '***.'])
+
+    def test_crossing_runs_keep_the_first_run_found(self):
+        game = BitboardGameState(['AXB', 'CXD', 'XXX'])
+        self.assertTrue(game.find_matches())
+        self.assertEqual(game.field().to_lists(), [[' A ', ' C ', '*X*'], [' X ', ' X ', '*X*'], [' B ', ' D ', '*X*']])
+
+    def test_runs_do_not_wrap_between_columns(self):
+        game = BitboardGameState(['  X', '  X', 'X  ', 'X  '])
+        self.assertFalse(game.find_matches())
+
+    def test_cells_changed_directly_are_read_again(self):
+        game = BitboardGameState(Size(4, 3))
+        game.cells()[0:3] = bytes(cell_code(' X ') for _ in range(3))
+        self.assertTrue(game.find_matches())
+
+    def test_snapshots_move_between_engines(self):
+        game = BitboardGameState(self.rows)
+        compact = CompactGameState(game.size())
+        compact.restore(game.snapshot()[:8])
+        game.restore(compact.snapshot())
+        self.assertEqual(game.field(), compact.field())
+        self.assertEqual(game.state_hash(), compact.state_hash())
+
+    def test_play_agrees_with_game_state(self):
+        rand = random.Random(24)
+        for full_scan in (False, True):
+            games = [GameState(self.rows, full_scan), BitboardGameState(self.rows, full_scan)]
+            events = [[], []]
+            for _ in range(200):
+                command = rand.choice('FRMDS  ')
+                column, pieces = rand.randrange(4), ''.join(rand.choice('XYZW') for _ in range(3))
+                direction = rand.choice((-1, 1))
+                for game, seen in zip(games, events):
+                    try:
+                        if command == 'F' and (game.faller() == None or game.faller().frozen()):
+                            game.new_faller(Faller(column, pieces))
+                        elif command == 'R':
+                            game.rotate_faller()
+                        elif command == 'M' and game.faller() != None \
+                            and 0 <= game.faller().position().column + direction < 4:
+                            game.move_faller(direction)
+                        elif command == 'D':
+                            seen.append(game.hard_drop())
+                        elif command == 'S':
+                            seen.append(game.resolve())
+                        seen.append(game.tick())
+                    except (GameOverError, InvalidMoveError) as error:
+                        seen.append(type(error))
+
+                self.assertEqual(games[0].field(), games[1].field())
+                self.assertEqual(games[0].state_hash(), games[1].state_hash())
+                if GameOverError in events[0]:
+                    break
+
+            self.assertEqual(events[0], events[1])
+
+if __name__ == "__main__":
+    test.main()
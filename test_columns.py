@@ -2,6 +2,7 @@
 
 import unittest as test
 from columns import *
+from instruments import Instruments
 
 class GameStateTests(test.TestCase):
     def setUp(self):
@@ -18,7 +19,7 @@ class GameStateTests(test.TestCase):
                 self.assertEqual(cell, '   ')
 
     def test_new_field_is_assembled_correctly(self):
-        self.assertEqual(self.test.field(), \
+        self.assertEqual(self.test.field().to_lists(), \
             [[' S ', ' S ', '   '],
             ['   ', '   ', '   '],
             [' V ', ' V ', ' V '],
@@ -30,39 +31,81 @@ class GameStateTests(test.TestCase):
 
     def test_pieces_fall_after_making_new_field(self):
         self.test.fall()
-        self.assertEqual(self.test.field(), \
+        self.assertEqual(self.test.field().to_lists(), \
             [['   ', ' S ', ' S '],
             ['   ', '   ', '   '],
             [' V ', ' V ', ' V '],
             ['   ', '   ', '   '],
             ['   ', ' Y ', ' X ']])
 
+    def test_pieces_keep_their_order_when_falling(self):
+        test = GameState(\
+            ['A ',
+            'B ',
+            '  ',
+            'C ',
+            '  '])
+        self.assertEqual(test.fall(), [0])
+        self.assertEqual(test.field().to_lists()[0], ['   ', '   ', ' A ', ' B ', ' C '])
+        self.assertEqual(test.fall(), [])
+
     def test_new_faller_head_is_shown(self):
         self.assertEqual(self.new.field()[1][0], '[X]')
         self.assertEqual(self.new.field()[1][1], '   ')
 
     def test_current_faller_can_move_laterally(self):
-        self.new.faller().fall(2, self.new.field()[1])
+        self.new.tick()
+        self.new.tick()
         self.new.move_faller(-1)
-        self.assertEqual(self.new.field()[0][0:3], ['[Y]', '[Z]', '[X]'])
-        self.assertEqual(self.new.field()[1][0:3], ['   ', '   ', '   '])
+        self.assertEqual(self.new.field().to_lists()[0][0:3], ['[Y]', '[Z]', '[X]'])
+        self.assertEqual(self.new.field().to_lists()[1][0:3], ['   ', '   ', '   '])
 
     def test_current_faller_can_be_blocked(self):
-        self.new.faller().fall(None, self.new.field()[1])
+        self.new.hard_drop()
         self.new.tick()
         self.new.new_faller(Faller(2, 'XXX'))
-        self.new.faller().fall(None, self.new.field()[2])
+        self.new.hard_drop()
         with self.assertRaises(InvalidMoveError):
             self.new.move_faller(-1)
 
+    def test_current_faller_cannot_leave_the_board(self):
+        test = GameState(Size(4, 2))
+        test.new_faller(Faller(0, 'XYZ'))
+        test.tick()
+        test.tick()
+        with self.assertRaises(InvalidMoveError):
+            test.move_faller(-1)
+        test.move_faller(1)
+        with self.assertRaises(InvalidMoveError):
+            test.move_faller(1)
+        self.assertEqual(test.faller().position(), Position(1, 2))
+        self.assertEqual(test.field().to_lists(), [['   '] * 4, ['[X]', '[Y]', '[Z]', '   ']])
+
+    def test_frozen_faller_stays_frozen_when_moved_over_a_gap(self):
+        test = GameState(['  ', '  ', '  ', ' X', ' X'])
+        test.new_faller(Faller(1, 'ABC'))
+        for _ in range(4):
+            test.tick()
+        test.move_faller(-1)
+        for _ in range(3):
+            test.tick()
+        self.assertTrue(test.faller().frozen())
+        self.assertEqual(test.field().to_lists()[0], [' A ', ' B ', ' C ', '   ', '   '])
+
+    def test_faller_outside_the_board_is_refused(self):
+        test = GameState(Size(4, 3))
+        with self.assertRaises(IndexError):
+            test.new_faller(Faller(3, 'XYZ'))
+        self.assertEqual(test.faller(), None)
+
     def test_current_faller_lands_when_it_can_no_longer_move_down(self):
-        self.new.faller().fall(None, self.new.field()[1])
-        self.assertEqual(self.new.field()[1][7:10], ['|Y|', '|Z|', '|X|'])
+        self.new.hard_drop()
+        self.assertEqual(self.new.field().to_lists()[1][7:10], ['|Y|', '|Z|', '|X|'])
 
     def test_current_faller_freezes_once_landed(self):
-        self.new.faller().fall(None, self.new.field()[1])
+        self.new.hard_drop()
         self.new.tick()
-        self.assertEqual(self.new.field()[1][7:10], [' Y ', ' Z ', ' X '])
+        self.assertEqual(self.new.field().to_lists()[1][7:10], [' Y ', ' Z ', ' X '])
 
     def test_matches_can_be_found(self):
         test = GameState(\
@@ -70,7 +113,7 @@ class GameStateTests(test.TestCase):
             'ZYX',
             'ZZX'])
         test.find_matches()
-        self.assertEqual(test.field()[2], ['*X*', '*X*', '*X*'])
+        self.assertEqual(test.field().to_lists()[2], ['*X*', '*X*', '*X*'])
 
     def test_diagonal_matches_can_be_found(self):
         test = GameState(\
@@ -78,7 +121,7 @@ class GameStateTests(test.TestCase):
             'ZYX',
             'ZZY'])
         test.find_matches()
-        self.assertEqual(test.field(), [['*Y*', ' Z ', ' Z '], [' Z ', '*Y*', ' Z '], [' X ', ' X ', '*Y*']])
+        self.assertEqual(test.field().to_lists(), [['*Y*', ' Z ', ' Z '], [' Z ', '*Y*', ' Z '], [' X ', ' X ', '*Y*']])
 
     def test_matches_greater_than_3_can_be_found(self):
         test = GameState(\
@@ -87,7 +130,81 @@ class GameStateTests(test.TestCase):
             'TYV',
             'TVV'])
         test.find_matches()
-        self.assertEqual(test.field()[0], ['*T*', '*T*', '*T*', '*T*'])
+        self.assertEqual(test.field().to_lists()[0], ['*T*', '*T*', '*T*', '*T*'])
+
+    def test_crossing_matches_keep_the_first_run_found(self):
+        for full_scan in (False, True):
+            test = GameState(\
+                ['AXB',
+                'CXD',
+                'XXX'], full_scan)
+            test.find_matches()
+            # the bottom row is found first, and the two cells left
+            # of the column are too few to make a run on their own
+            self.assertEqual(test.field().to_lists(), [[' A ', ' C ', '*X*'], [' X ', ' X ', '*X*'], [' B ', ' D ', '*X*']])
+
+        test = GameState(\
+            ['XAX',
+            'XXB',
+            'XCX',
+            'XDE'])
+        test.find_matches()
+        self.assertEqual(test.field().to_lists()[0], ['*X*', '*X*', '*X*', '*X*'])
+        self.assertEqual(test.field().to_lists()[1][1], ' X ')
+
+    def test_matches_do_not_wrap_between_columns(self):
+        test = GameState(\
+            ['XY',
+            'YX',
+            'XY'])
+        self.assertFalse(test.find_matches())
+        self.assertEqual(match_mask(bytes(6), 3), bytes(6))
+
+    def test_only_changed_cells_are_searched_after_first_search(self):
+        for full_scan in (False, True):
+            test = GameState(Size(3, 3), full_scan)
+            self.assertFalse(test.find_matches())
+            # changing the board through a snapshot leaves
+            # no record of which cells changed
+            field, faller, dirty, hashes, marked = test.snapshot()
+            test.restore((([' X ', ' X ', ' X '],) + field[1:], faller, dirty, None, marked))
+            self.assertEqual(test.find_matches(), full_scan)
+
+    def test_matches_through_fallen_pieces_are_found(self):
+        test = GameState(\
+            ['XY ',
+            'ZZZ',
+            'YX ',
+            'YXX'])
+        test.find_matches()
+        test.tick()
+        test.find_matches()
+        self.assertEqual(test.field().to_lists(), \
+            [['   ', '*X*', ' Y ', ' Y '],
+            ['   ', ' Y ', '*X*', ' X '],
+            ['   ', '   ', '   ', '*X*']])
+
+    def test_runs_made_by_rotating_a_matched_faller_are_found(self):
+        boards = []
+        for full_scan in (False, True):
+            test = GameState(\
+                ['   X',
+                '  XE',
+                'Q QF',
+                'A CG',
+                'B DH'], full_scan)
+            test.new_faller(Faller(1, 'XPQ'))
+            for _ in range(6):
+                test.tick()
+            # the top piece is matched, and rotating it leaves a Q
+            # behind when it is cleared and the faller drops it
+            test.rotate_faller()
+            test.tick()
+            test.tick()
+            boards.append(test.field())
+
+        self.assertEqual(boards[0], boards[1])
+        self.assertEqual(boards[0].row(2), ('*Q*', '*Q*', '*Q*', ' F '))
 
     def test_collateral_matches_can_be_found(self):
         test = GameState(\
@@ -129,7 +246,55 @@ class GameStateTests(test.TestCase):
         test.new_faller(Faller(2, 'TXX'))
         test.tick()
         test.tick()
-        self.assertEqual(test.field()[2], ['*X*', '*X*', '*X*'])
+        self.assertEqual(test.field().to_lists()[2], ['*X*', '*X*', '*X*'])
+
+    def test_hard_drop_lands_where_ticking_would(self):
+        ticked = self.new.clone()
+        for _ in range(9):
+            ticked.tick()
+
+        self.assertEqual(self.new.hard_drop(), [LANDED_EVENT])
+        self.assertEqual(self.new, ticked)
+        self.assertEqual(self.new.field().to_lists()[1][6:10], ['   ', '|Y|', '|Z|', '|X|'])
+        self.assertEqual(self.new.hard_drop(), [])
+
+    def test_hard_drop_can_resolve_matches(self):
+        test = GameState(\
+            ['    ',
+            '    ',
+            '    ',
+            'X   ',
+            'YZ  ',
+            'ZY W'])
+        test.new_faller(Faller(0, 'ZXX'))
+        self.assertEqual(test.hard_drop(resolve = True),
+            [LANDED_EVENT, FROZEN_EVENT, MATCHED_EVENT, CLEARED_EVENT, 0])
+        self.assertEqual(test.field().to_lists()[0], ['   '] * 3 + [' Z ', ' Y ', ' Z '])
+        self.assertTrue(test.faller().frozen())
+
+    def test_resolve_counts_each_step_of_a_chain(self):
+        test = GameState(\
+            [' Y ',
+            ' X ',
+            ' X ',
+            'YXY',
+            'ZWZ'])
+        ticked = test.clone()
+        while ticked.tick():
+            pass
+
+        self.assertEqual(test.resolve(), [3, 3])
+        self.assertEqual(test, ticked)
+        self.assertEqual(test.resolve(), [])
+
+    def test_resolve_waits_for_faller(self):
+        self.assertEqual(self.new.resolve(), [])
+        self.assertEqual(self.new.field()[1][0], '[X]')
+
+    def test_seeded_match_mask_follows_runs_from_seeds(self):
+        cells = bytes([97, 97, 97, 98, 98, 98])
+        self.assertEqual(seeded_match_mask(cells, 3, bytes([0, 1, 0, 0, 0, 0])), bytes([1, 1, 1, 0, 0, 0]))
+        self.assertEqual(seeded_match_mask(cells, 3, bytes(6)), bytes(6))
 
     def test_off_screen_matches_can_be_found(self):
         test = GameState(\
@@ -139,35 +304,212 @@ class GameStateTests(test.TestCase):
         test.new_faller(Faller(2, 'TXX'))
         test.tick()
         test.tick()
-        self.assertEqual(test.field()[2], ['*X*', '*X*', ' P '])
+        self.assertEqual(test.field().to_lists()[2], ['*X*', '*X*', ' P '])
         test.tick()
-        self.assertEqual(test.field()[2], ['   ', ' T ', ' P '])
+        self.assertEqual(test.field().to_lists()[2], ['   ', ' T ', ' P '])
 
     def test_collateral_match_can_be_found_with_fallers(self):
         test = GameState(Size(6, 3))
         test.new_faller(Faller(0, 'XTT'))
-        test.faller().fall(None, test.field()[0])
+        test.hard_drop()
         test.tick()
         test.new_faller(Faller(0, 'TXX'))
-        test.faller().fall(None, test.field()[0])
+        test.hard_drop()
+        test.tick()
+        test.tick()
+        self.assertEqual(test.field().to_lists()[0], [' T ', '*X*', '*X*', '*X*', ' T ', ' T '])
+        test.tick()
+        test.tick()
+        self.assertEqual(test.field().to_lists()[0], ['   ', '   ', '   ', '*T*', '*T*', '*T*'])
+
+    def test_instruments_see_every_phase(self):
+        instruments = Instruments()
+        events = []
+        instruments.add_hook(lambda phase, event: events.append((phase, event)))
+
+        test = GameState(\
+            ['   ',
+            'ZVX',
+            'TJX'])
+        test.instrument(instruments)
+        test.new_faller(Faller(2, 'TXX'))
         test.tick()
         test.tick()
-        self.assertEqual(test.field()[0], [' T ', '*X*', '*X*', '*X*', ' T ', ' T '])
         test.tick()
+
+        self.assertEqual(events[:4], [('tick', 'start'), ('clear', 'start'), ('clear', 'end'), ('freeze', 'start')])
+        self.assertEqual(instruments.timings()['tick'][0], 3)
+        self.assertEqual(instruments.counters()['matches_found'], 4)
+        self.assertEqual(instruments.counters()['cascades'], 1)
+        self.assertIn('gravity', instruments.report())
+
+        test.instrument(None)
         test.tick()
-        self.assertEqual(test.field()[0], ['   ', '   ', '   ', '*T*', '*T*', '*T*'])
+        self.assertEqual(instruments.timings()['tick'][0], 3)
+
+    def test_clearing_only_looks_at_marked_cells(self):
+        instruments = Instruments()
+        test = GameState(Size(100, 100))
+        test.instrument(instruments)
+        test.new_faller(Faller(50, 'XYZ'))
+        for _ in range(3):
+            test.tick()
+        # only the faller's cells could hold matched jewels
+        self.assertLessEqual(instruments.counters()['cells_scanned'], 3 * 3)
+
+        test = GameState(\
+            ['XYZ',
+            'XYZ',
+            'XZY'])
+        test.instrument(instruments)
+        test.find_matches()
+        instruments.reset()
+        test.tick()
+        self.assertEqual(instruments.counters()['cells_scanned'], 3)
+        self.assertEqual(test.field().to_lists()[0], ['   ', '   ', '   '])
+
+    def test_clone_does_not_change_original(self):
+        clone = self.new.clone()
+        for _ in range(10):
+            clone.tick()
+
+        self.assertEqual(self.new.faller().position(), Position(1, 0))
+        self.assertEqual(self.new.field().to_lists()[1][:2], ['[X]', '   '])
+        self.assertEqual(clone.field().to_lists()[1][-3:], [' Y ', ' Z ', ' X '])
+
+        self.new.move_faller(1)
+        self.assertEqual(clone.field().to_lists()[2], ['   '] * 10)
+        self.assertEqual(clone.faller().position(), Position(1, 9))
+
+    def test_restore_returns_to_snapshot(self):
+        snapshot = self.new.snapshot()
+        for _ in range(2):
+            self.new.tick()
+            self.new.move_faller(-1)
+            self.new.restore(snapshot)
+            self.assertEqual(self.new.faller().position(), Position(1, 0))
+            self.assertEqual(self.new.faller().pieces(), ['[Y]', '[Z]', '[X]'])
+            self.assertEqual(self.new.field().to_lists(), [['   '] * 10, ['[X]'] + ['   '] * 9] + [['   '] * 10] * 8)
+
+    def test_zobrist_hash_depends_on_cells(self):
+        keys = ZobristKeys(Size(3, 5))
+        swapped = GameState(\
+            ['S V X',
+            'S V  ',
+            '  V Y'])
+        self.assertEqual(keys.hash_field(self.test.field()), keys.hash_field(GameState(['S V Y', 'S V  ', '  V X']).field()))
+        self.assertNotEqual(keys.hash_field(self.test.field()), keys.hash_field(swapped.field()))
+        self.assertEqual(keys.hash_field(GameState(Size(3, 5)).field()), 0)
+
+    def test_state_hash_follows_changes(self):
+        other = GameState(Size(10, 10))
+        other.new_faller(Faller(1, 'YZX'))
+        self.assertEqual(self.new.state_hash(), other.state_hash())
+        self.assertEqual(self.new, other)
+
+        other.tick()
+        self.assertNotEqual(self.new.state_hash(), other.state_hash())
+        self.assertNotEqual(self.new, other)
+
+        clone = self.new.clone()
+        self.new.tick()
+        self.assertEqual(self.new.state_hash(), other.state_hash())
+        self.assertEqual(self.new, other)
+        self.assertNotEqual(clone, other)
+
+    def test_column_cache_gives_same_results(self):
+        cache = ColumnCache()
+        cached = GameState(['S V Y', 'S V  ', '  V X'], full_scan = True, column_cache = cache)
+        self.test.fall()
+        cached.fall()
+        self.assertEqual(cached.field(), self.test.field())
+        self.assertEqual(cached.find_matches(), self.test.find_matches())
+        self.assertEqual(cached.field(), self.test.field())
+        self.assertEqual((cache.misses(), cache.hits()), (6, 4))
+
+    def test_column_cache_forgets_least_recently_used(self):
+        cache = ColumnCache(2)
+        first, second, third = (' X ', '   '), (' Y ', '   '), (' Z ', '   ')
+        cache.get(first)
+        cache.get(second)
+        self.assertEqual(cache.get(first).settled, ('   ', ' X '))
+        cache.get(third)
+        self.assertEqual(len(cache), 2)
+        cache.get(first)
+        cache.get(second)
+        self.assertEqual((cache.misses(), cache.hits()), (4, 2))
+
+        cache.clear()
+        self.assertEqual((len(cache), cache.misses(), cache.hits()), (0, 0, 0))
+
+class FieldViewTests(test.TestCase):
+    def setUp(self):
+        self.game = GameState(\
+            ['S V Y',
+            'S V  ',
+            '  V X'])
+        self.view = self.game.field()
+
+    def test_view_reads_cells(self):
+        self.assertEqual(len(self.view), 5)
+        self.assertEqual(self.view[0], (' S ', ' S ', '   '))
+        self.assertEqual(self.view[-1], (' Y ', '   ', ' X '))
+        self.assertEqual(self.view.cell(2, 1), ' V ')
+        self.assertEqual(self.view.row(2), ('   ', '   ', ' V ', '   ', ' X '))
+        self.assertEqual(self.view.rows()[0], self.view.row(0))
+        self.assertEqual(self.view.cell(-1, -1), ' X ')
+        self.assertEqual(self.view.row(-3), self.view.row(0))
+        with self.assertRaises(IndexError):
+            self.view[5]
+        with self.assertRaises(IndexError):
+            self.view.cell(0, 3)
+        with self.assertRaises(IndexError):
+            self.view.row(-4)
+
+    def test_view_is_read_only(self):
+        with self.assertRaises(TypeError):
+            self.view[0][0] = ' X '
+
+        lists = self.view.to_lists()
+        lists[0][0] = ' X '
+        self.assertEqual(self.view[0][0], ' S ')
+
+    def test_view_follows_the_game(self):
+        self.game.fall()
+        self.assertEqual(self.view[4], ('   ', ' Y ', ' X '))
+        self.assertEqual(self.view.render(), '|       V       |\n| S     V     Y |\n| S     V     X |\n --------------- \n')
+
+    def test_views_of_equal_boards_are_equal(self):
+        self.assertEqual(self.view, GameState(['S V Y', 'S V  ', '  V X']).field())
+        self.assertNotEqual(self.view, GameState(Size(3, 5)).field())
 
 class FallerTests(test.TestCase):
     def setUp(self):
         self.new = Faller(0, 'YZX')
-        self.field = GameState(Size(4, 3))
+        self.column = ['   '] * 4
 
     def test_new_faller_is_assembled_correctly(self):
         self.assertEqual(self.new.pieces(), ['[Y]', '[Z]', '[X]'])
 
     def test_faller_can_rotate(self):
-        self.new.rotate(self.field.field()[0])
+        self.new.rotate(self.column)
         self.assertEqual(self.new.pieces(), ['[X]', '[Y]', '[Z]'])
 
+    def test_faller_rotates_back_to_start(self):
+        for _ in range(3):
+            self.new.rotate(self.column)
+        self.assertEqual(self.new.pieces(), ['[Y]', '[Z]', '[X]'])
+        self.assertEqual(self.new.head(), '[X]')
+
+    def test_faller_position_changes_in_place(self):
+        self.new.fall(None, self.column)
+        self.assertEqual(self.new.position(), Position(0, 3))
+        self.assertEqual(self.new.pieces(), ['|Y|', '|Z|', '|X|'])
+        self.new.tick()
+        self.assertTrue(self.new.frozen())
+        self.assertEqual(self.new.pieces(), [' Y ', ' Z ', ' X '])
+        with self.assertRaises(AttributeError):
+            self.new.extra = None
+
 if __name__ == "__main__":
     test.main()
\ No newline at end of file
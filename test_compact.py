@@ -0,0 +1,204 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+from compact import *
+
+class CompactGameStateTests(test.TestCase):
+    def setUp(self):
+        self.new = CompactGameState(Size(10, 10))
+        self.new.new_faller(Faller(1, 'YZX'))
+        self.test = CompactGameState\
+            (['S V Y',
+            'S V  ',
+            '  V X'])
+
+    def test_new_game_state_is_empty(self):
+        self.assertEqual(CompactGameState(Size(100, 100)).cells(), bytearray(100 * 100))
+
+    def test_field_matches_game_state(self):
+        self.assertEqual(self.test.field(), GameState(['S V Y', 'S V  ', '  V X']).field())
+        self.assertEqual(self.test.size(), Size(3, 5))
+        self.assertEqual(self.test.field().cell(4, 2), ' X ')
+        self.assertEqual(self.test.field().row(1), (' S ', '   ', ' V ', '   ', '   '))
+
+    def test_cells_are_single_bytes(self):
+        self.assertEqual(len(self.test.cells()), 15)
+        self.assertEqual(cell_string(self.test.cells()[0]), ' S ')
+        self.assertEqual(cell_state(self.test.cells()[0]), FROZEN)
+
+    def test_pieces_keep_their_order_when_falling(self):
+        test = CompactGameState(['A ', 'B ', '  ', 'C ', '  '])
+        self.assertEqual(test.fall(), [0])
+        self.assertEqual(test.field().to_lists()[0], ['   ', '   ', ' A ', ' B ', ' C '])
+        self.assertEqual(test.fall(), [])
+
+    def test_new_faller_head_is_shown(self):
+        self.assertEqual(self.new.field()[1][0], '[X]')
+        self.assertEqual(self.new.faller().position(), Position(1, 0))
+
+    def test_faller_lands_and_freezes(self):
+        for _ in range(9):
+            self.new.tick()
+        self.assertEqual(self.new.field().to_lists()[1][7:10], ['|Y|', '|Z|', '|X|'])
+        self.assertTrue(self.new.faller().landed())
+        self.new.tick()
+        self.assertEqual(self.new.field().to_lists()[1][7:10], [' Y ', ' Z ', ' X '])
+        self.assertTrue(self.new.faller().frozen())
+
+    def test_faller_can_rotate(self):
+        self.new.rotate_faller()
+        self.assertEqual(self.new.faller().pieces(), ['[X]', '[Y]', '[Z]'])
+        self.assertEqual(self.new.field()[1][0], '[Z]')
+
+    def test_current_faller_can_be_blocked(self):
+        test = CompactGameState(['   ', '   ', 'X  ', 'X  '])
+        test.new_faller(Faller(1, 'YZX'))
+        test.tick()
+        test.tick()
+        with self.assertRaises(InvalidMoveError):
+            test.move_faller(-1)
+
+    def test_matches_can_be_found(self):
+        test = CompactGameState(\
+            ['YZX',
+            'ZYX',
+            'ZZY'])
+        self.assertTrue(test.find_matches())
+        self.assertEqual(test.field().to_lists(), [['*Y*', ' Z ', ' Z '], [' Z ', '*Y*', ' Z '], [' X ', ' X ', '*Y*']])
+        test.tick()
+        self.assertEqual(test.field().to_lists(), [['   ', ' Z ', ' Z '], ['   ', ' Z ', ' Z '], ['   ', ' X ', ' X ']])
+
+    def test_crossing_matches_agree_with_game_state(self):
+        rows = ['XAX', 'XXB', 'XCX', 'XDE']
+        for full_scan in (False, True):
+            games = [GameState(rows, full_scan), CompactGameState(rows, full_scan)]
+            for game in games:
+                self.assertTrue(game.find_matches())
+            self.assertEqual(games[0].field(), games[1].field())
+
+    def test_runs_made_by_rotating_a_matched_faller_are_found(self):
+        rows = ['   X', '  XE', 'Q QF', 'A CG', 'B DH']
+        games = [GameState(rows, True), CompactGameState(rows)]
+        for game in games:
+            game.new_faller(Faller(1, 'XPQ'))
+            for _ in range(6):
+                game.tick()
+            game.rotate_faller()
+            game.tick()
+            game.tick()
+        self.assertEqual(games[0].field(), games[1].field())
+
+    def test_moves_off_the_board_agree_with_game_state(self):
+        games = [GameState(['S    ', '     ', '     ']), CompactGameState(['S    ', '     ', '     '])]
+        for game in games:
+            game.fall()
+            game.new_faller(Faller(0, 'SSS'))
+            game.tick()
+            game.tick()
+            with self.assertRaises(InvalidMoveError):
+                game.move_faller(-1)
+            for _ in range(3):
+                try:
+                    game.tick()
+                except GameOverError:
+                    pass
+        self.assertEqual(games[0].field(), games[1].field())
+        self.assertEqual(games[0].faller().position(), games[1].faller().position())
+
+    def test_frozen_faller_moved_over_a_gap_agrees_with_game_state(self):
+        rows = ['  ', '  ', '  ', ' X', ' X']
+        games = [GameState(rows), CompactGameState(rows)]
+        for game in games:
+            game.new_faller(Faller(1, 'ABC'))
+            for _ in range(4):
+                game.tick()
+            game.move_faller(-1)
+            for _ in range(3):
+                game.tick()
+        self.assertEqual(games[0].field(), games[1].field())
+        self.assertTrue(games[1].faller().frozen())
+
+    def test_game_ends_when_faller_can_only_partially_fit(self):
+        test = CompactGameState(\
+            ['   ',
+            'XYZ',
+            'VVT'])
+        with self.assertRaises(GameOverError):
+            test.new_faller(Faller(1, 'JJX'))
+            test.tick()
+            test.tick()
+
+    def test_off_screen_matches_can_be_found(self):
+        test = CompactGameState(\
+            ['   ',
+            'ZVX',
+            'TJP'])
+        test.new_faller(Faller(2, 'TXX'))
+        test.tick()
+        test.tick()
+        self.assertEqual(test.field().to_lists()[2], ['*X*', '*X*', ' P '])
+        test.tick()
+        self.assertEqual(test.field().to_lists()[2], ['   ', ' T ', ' P '])
+
+    def test_collateral_match_agrees_with_game_state(self):
+        games = [GameState(Size(6, 3)), CompactGameState(Size(6, 3))]
+        for game in games:
+            for pieces in ('XTT', 'TXX'):
+                game.new_faller(Faller(0, pieces))
+                for _ in range(7):
+                    game.tick()
+        self.assertEqual(games[0].field(), games[1].field())
+        self.assertEqual(games[1].cells(), bytearray(6 * 3))
+
+    def test_hard_drop_agrees_with_game_state(self):
+        rows = ['   ', '   ', '   ', 'Y  ', 'XZ ', 'XYY']
+        for column, pieces in ((0, 'YZX'), (1, 'ZZX'), (2, 'XZY')):
+            compact, game = CompactGameState(rows), GameState(rows)
+            compact.new_faller(Faller(column, pieces))
+            game.new_faller(Faller(column, pieces))
+            self.assertEqual(compact.hard_drop(resolve = True), game.hard_drop(resolve = True))
+            self.assertEqual(compact.field(), game.field())
+
+    def test_resolve_agrees_with_game_state(self):
+        rows = [' Y ', ' X ', ' X ', 'YXY', 'ZWZ']
+        for full_scan in (False, True):
+            compact, game = CompactGameState(rows, full_scan), GameState(rows, full_scan)
+            self.assertEqual(compact.resolve(), game.resolve())
+            self.assertEqual(compact.field(), game.field())
+
+    def test_game_ends_when_resolved_faller_cannot_fit(self):
+        test = CompactGameState(['   ', 'XYZ', 'VVT'])
+        test.new_faller(Faller(1, 'JJX'))
+        test.tick()
+        with self.assertRaises(GameOverError):
+            test.resolve()
+
+    def test_clone_and_restore_agree_with_game_state(self):
+        games = [GameState(Size(6, 3)), CompactGameState(Size(6, 3))]
+        for game in games:
+            game.new_faller(Faller(0, 'XTT'))
+            snapshot = game.snapshot()
+            clone = game.clone()
+            for _ in range(7):
+                clone.tick()
+            game.move_faller(1)
+            game.restore(snapshot)
+            self.assertEqual(clone.field().to_lists()[0][3:], [' X ', ' T ', ' T '])
+        self.assertEqual(games[0].field(), games[1].field())
+        self.assertEqual(games[0].faller().position(), games[1].faller().position())
+
+    def test_state_hash_agrees_with_game_state(self):
+        games = [GameState(Size(6, 3)), CompactGameState(Size(6, 3))]
+        hashes = [[], []]
+        for game, seen in zip(games, hashes):
+            for pieces in ('XTT', 'TXX'):
+                game.new_faller(Faller(0, pieces))
+                for _ in range(7):
+                    game.tick()
+                    seen.append(game.state_hash())
+        self.assertEqual(hashes[0], hashes[1])
+        self.assertEqual(len(set(hashes[0])), 13)
+        self.assertEqual(games[1], games[1].clone())
+
+if __name__ == "__main__":
+    test.main()
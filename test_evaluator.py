@@ -0,0 +1,31 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+from evaluator import *
+
+class EvaluatorTests(test.TestCase):
+    def setUp(self):
+        self.test = GameState(\
+            ['   ',
+            'Y  ',
+            'Z  ',
+            'X X'])
+
+    def test_scores_do_not_depend_on_engine_or_workers(self):
+        with PlacementEvaluator(1) as single, PlacementEvaluator(3) as several:
+            scores = single.evaluate(self.test, Faller(1, 'YZX'))
+            self.assertEqual(scores, several.evaluate(self.test, Faller(1, 'YZX')))
+            self.assertEqual(scores, several.evaluate(CompactGameState(['   ', 'Y  ', 'Z  ', 'X X']), Faller(1, 'YZX')))
+
+        self.assertEqual(scores[0], PlacementScore(search.Placement(1, 0), 3, 2, False))
+        # the jewels in the first column block the faller from reaching it
+        self.assertEqual([score.placement.column for score in scores], [1, 1, 1, 2, 2, 2])
+
+    def test_game_over_is_scored(self):
+        with PlacementEvaluator(2) as evaluator:
+            scores = evaluator.evaluate(self.test, Faller(0, 'STV'))
+        self.assertEqual(scores[0], PlacementScore(search.Placement(0, 0), 0, 4, True))
+        self.assertEqual([score.game_over for score in scores], [True] * 3)
+
+if __name__ == "__main__":
+    test.main()
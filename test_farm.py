@@ -0,0 +1,35 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+from farm import *
+
+class FarmTests(test.TestCase):
+    def setUp(self):
+        self.games = [
+            ('empty', ['4', '3', 'EMPTY', 'F 3 X Y Z', '', '', '', '', 'Q']),
+            ('match', ['4', '3', 'CONTENTS', '   ', '   ', '  X', '  X', 'F 3 Y Z X', '', '', '', '']),
+            ('over', ['2', '1', 'CONTENTS', 'X', 'Y', 'F 1 Z Z Z', ''])]
+
+    def test_game_outcomes_are_counted(self):
+        outcomes = [replay(*game) for game in self.games]
+        self.assertEqual(outcomes[0][1:4], (4, 0, False))
+        self.assertEqual(outcomes[1][1:4], (4, 3, False))
+        self.assertEqual(outcomes[2][1:4], (0, 0, True))
+
+    def test_matches_on_load_are_counted(self):
+        outcome = replay('loaded', ['4', '3', 'CONTENTS', '   ', '   ', '   ', 'XXX', 'F 2 Y Z Y', '', '', '', '', ''])
+        self.assertEqual(outcome[1:4], (5, 3, False))
+
+    def test_jobs_are_split_into_a_few_chunks_per_worker(self):
+        self.assertEqual(pool_shape(100, 5), (5, 5))
+        self.assertEqual(pool_shape(3, 5), (5, 1))
+
+    def test_results_do_not_depend_on_worker_count(self):
+        single = run_farm(self.games * 3, 1)
+        several = run_farm(self.games * 3, 3)
+        self.assertEqual(single, several)
+        self.assertEqual(single[:4], (9, 3, 24, 9))
+        self.assertEqual([outcome.name for outcome in several.outcomes], ['empty', 'match', 'over'] * 3)
+
+if __name__ == "__main__":
+    test.main()
@@ -0,0 +1,57 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+from fuzz import *
+
+class _SkipsRotation(compact.CompactGameState):
+    def rotate_faller(self) -> None:
+        # rotating a faller with the same jewel on either end is left
+        # out, which only shows once its middle piece is different
+        if self._pieces and self._pieces[0] != self._pieces[-1]:
+            super().rotate_faller()
+
+class FuzzTests(test.TestCase):
+    def test_backends_agree_with_game_state(self):
+        summary = fuzz(list(BACKENDS), 30, seed = 100)
+        self.assertEqual(summary.games, 30)
+        self.assertGreater(summary.steps, 0)
+        self.assertEqual(summary.divergences, [])
+
+    def test_incremental_searches_agree_with_a_full_board_search(self):
+        summary = fuzz(list(BACKENDS), 10, seed = 2455, length = 100, searches = 'full')
+        self.assertGreater(summary.steps, 0)
+        self.assertEqual(summary.divergences, [])
+
+        game = random_game(3)
+        divergences = play(game, False, {'game': columns.GameState}, True)
+        self.assertEqual(divergences, {})
+
+    def test_divergence_is_found_and_minimised(self):
+        backends = {'skips': _SkipsRotation}
+        for seed in range(100):
+            divergences = play(random_game(seed), False, backends)
+            if divergences:
+                break
+
+        divergence = divergences['skips']
+        self.assertEqual(divergence.game.commands[divergence.step].action, 'R')
+
+        smallest = minimize(divergence, 'skips', _SkipsRotation)
+        actions = [command.action for command in smallest.game.commands]
+        self.assertEqual(actions[0], 'F')
+        self.assertEqual(set(actions[1:]), {'R'})
+        self.assertEqual(smallest.game.field, [' ' * len(divergence.game.field[0])] * len(divergence.game.field))
+        self.assertIn('DIVERGENCE in skips', report('skips', smallest))
+
+    def test_scripts_are_read_back(self):
+        game = random_game(7)
+        self.assertEqual(read_game(script(game), 7), game)
+
+    def test_results_do_not_depend_on_worker_count(self):
+        single = fuzz(['compact'], 8, workers = 1)
+        several = fuzz(['compact'], 8, workers = 2)
+        self.assertEqual(single[:2], several[:2])
+        self.assertEqual(single.divergences, several.divergences)
+
+if __name__ == "__main__":
+    test.main()
@@ -0,0 +1,98 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+import io
+from gamelog import *
+
+class GameLogTests(test.TestCase):
+    def setUp(self):
+        self.game = columns.GameState(\
+            ['   ',
+            '   ',
+            '   ',
+            '   ',
+            'X Y'])
+        self.output = io.BytesIO()
+        self.writer = GameLogWriter(self.output, self.game, 3)
+        self.game.record(self.writer)
+
+        # the board after each tick, starting with none
+        self.boards = [self.game.clone()]
+        for command in ['F 2 Y Z X', '', 'R', '<', '', '', '>', '', '', '', '', 'F 1 X X Y', '', '', '', '', '']:
+            if command == '':
+                self.game.tick()
+                self.boards.append(self.game.clone())
+            elif command[0] == 'F':
+                self.game.new_faller(columns.Faller(int(command[2]) - 1, command[4:].replace(' ', '')))
+            elif command == 'R':
+                self.game.rotate_faller()
+            else:
+                try:
+                    self.game.move_faller(-1 if command == '<' else 1)
+                except columns.InvalidMoveError:
+                    pass
+
+    def test_seek_gives_every_tick(self):
+        self.writer.close()
+        reader = GameLogReader(self.output.getvalue())
+        self.assertEqual(reader.size(), columns.Size(5, 3))
+        self.assertEqual(reader.ticks(), 12)
+        self.assertEqual(reader.keyframes(), [0, 3, 6, 9, 12])
+        for tick in range(len(self.boards)):
+            self.assertEqual(reader.seek(tick), self.boards[tick])
+
+    def test_unclosed_log_can_be_read(self):
+        self.writer.close()
+        data = self.output.getvalue()
+        index = int.from_bytes(data[-8 - len(MAGIC):-len(MAGIC)], 'little')
+        reader = GameLogReader(data[:index - 1])
+        self.assertEqual(reader.ticks(), 12)
+        self.assertEqual(reader.keyframes(), [0, 3, 6, 9, 12])
+        self.assertEqual(reader.seek(12), self.boards[12])
+
+    def test_repeated_commands_are_run_together(self):
+        output = io.BytesIO()
+        game = columns.GameState(columns.Size(4, 3))
+        writer = GameLogWriter(output, game, 1000)
+        game.record(writer)
+        for _ in range(100):
+            game.tick()
+        writer.close()
+
+        self.assertEqual(output.getvalue()[len(MAGIC) + 19:len(MAGIC) + 22], bytes([0x98, 0x06, 6]))
+        self.assertEqual(GameLogReader(output.getvalue()).seek(100), game)
+
+    def test_drops_are_replayed(self):
+        self.game.new_faller(columns.Faller(1, 'ZYZ'))
+        self.game.hard_drop(resolve = True)
+        self.writer.close()
+        reader = GameLogReader(self.output.getvalue())
+        self.assertEqual(reader.seek(reader.ticks()), self.game)
+
+    def test_restores_are_replayed(self):
+        self.game.new_faller(columns.Faller(1, 'ZYZ'))
+        snapshot = self.game.snapshot()
+        for _ in range(3):
+            self.game.tick()
+        before = self.game.clone()
+        self.game.restore(snapshot)
+        self.game.tick()
+        self.writer.close()
+        data = self.output.getvalue()
+        index = int.from_bytes(data[-8 - len(MAGIC):-len(MAGIC)], 'little')
+        for reader in (GameLogReader(data), GameLogReader(data[:index - 1])):
+            self.assertEqual(reader.ticks(), 16)
+            self.assertEqual(reader.keyframes(), [0, 3, 6, 9, 12, 15])
+            self.assertEqual(reader.seek(15), before)
+            self.assertEqual(reader.seek(16), self.game)
+
+    def test_clones_are_not_recorded(self):
+        self.game.clone().tick()
+        self.assertEqual(self.writer.ticks(), 12)
+
+    def test_other_data_is_rejected(self):
+        with self.assertRaises(GameLogError):
+            GameLogReader(b'4\n3\nEMPTY\n')
+
+if __name__ == "__main__":
+    test.main()
@@ -0,0 +1,43 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+import os
+import tempfile
+from loader import *
+
+class LoaderTests(test.TestCase):
+    def setUp(self):
+        self.rows = ['S V Y', 'S V  ', '  V X']
+
+    def test_board_is_read_like_user_input(self):
+        game = read_field(b'3\n5\nCONTENTS\n' + '\n'.join(self.rows).encode() + b'\nF 1 X Y Z\n')
+        self.assertEqual(game.cells(), CompactGameState(self.rows).cells())
+        self.assertEqual(game.field(), GameState(self.rows).field())
+
+    def test_short_rows_are_padded(self):
+        data = b'3\r\n5\r\nCONTENTS\r\n' + '\r\n'.join(row.rstrip() for row in self.rows).encode()
+        self.assertEqual(read_field(data).cells(), CompactGameState(self.rows).cells())
+
+    def test_empty_board(self):
+        self.assertEqual(read_field(b'4\n3\nEMPTY\n').cells(), bytearray(12))
+
+    def test_only_jewels_are_allowed(self):
+        with self.assertRaises(ValueError):
+            read_field(b'1\n3\nCONTENTS\nX?Y\n')
+        with self.assertRaises(ValueError):
+            read_field(b'3\n3\nCONTENTS\nXYZ\n')
+
+    def test_board_file_is_mapped(self):
+        with tempfile.NamedTemporaryFile('wb', delete = False) as file:
+            file.write(b'3\n5\nCONTENTS\n' + '\n'.join(self.rows).encode() + b'\n')
+
+        try:
+            game = load_field(file.name)
+        finally:
+            os.remove(file.name)
+
+        game.fall()
+        self.assertEqual(game.field().to_lists()[4], ['   ', ' Y ', ' X '])
+
+if __name__ == "__main__":
+    test.main()
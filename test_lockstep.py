@@ -0,0 +1,87 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+import random
+from lockstep import *
+
+class LockstepTests(test.TestCase):
+    def setUp(self):
+        self.size = Size(6, 4)
+        self.rows = ['    ', '    ', '    ', 'X   ', 'YZ  ', 'ZY W']
+
+    def test_games_match_compact_games(self):
+        rand = random.Random(4)
+        games = [CompactGameState(self.rows, full_scan = index % 2 == 0) for index in range(6)]
+        lockstep = Lockstep(self.size, games)
+        over = [False] * len(games)
+
+        for step in range(120):
+            for index, game in enumerate(games):
+                if over[index] or not (game.faller() == None or game.faller().frozen()):
+                    continue
+
+                faller = Faller(rand.randrange(1, 4), ''.join(rand.choice('XYZW') for _ in range(3)))
+                try:
+                    game.new_faller(faller)
+                except GameOverError:
+                    over[index] = True
+                self.assertEqual(lockstep.new_faller(index, faller), not over[index])
+
+            lockstep.tick()
+            for index, game in enumerate(games):
+                if not over[index]:
+                    try:
+                        game.tick()
+                    except GameOverError:
+                        over[index] = True
+
+                self.assertEqual(lockstep.game_over(index), over[index])
+                self.assertEqual(lockstep.game(index).cells(), game.cells())
+                self.assertEqual(lockstep.game(index)._faller_state(), game._faller_state())
+
+        self.assertTrue(all(over))
+
+    def test_chains_are_cleared_like_compact_games(self):
+        rand = random.Random(29)
+        games = [CompactGameState(['    '] * 2 + [''.join(rand.choice('XYZ  ') for _ in range(4)) for _ in range(4)])
+            for _ in range(8)]
+        lockstep = Lockstep(self.size, games)
+        lockstep.new_faller(3, Faller(1, 'XYZ'))
+        games[3].new_faller(Faller(1, 'XYZ'))
+
+        for _ in range(12):
+            lockstep.tick()
+            for index, game in enumerate(games):
+                game.tick()
+                self.assertEqual(lockstep.game(index).cells(), game.cells())
+                self.assertEqual(lockstep.game(index)._faller_state(), game._faller_state())
+
+    def test_tick_events(self):
+        lockstep = Lockstep(self.size, [CompactGameState(self.rows), CompactGameState(self.size)])
+        lockstep.new_faller(0, Faller(0, 'ZXX'))
+        lockstep.new_faller(1, Faller(0, 'ZXX'))
+
+        self.assertEqual(lockstep.tick(), bytearray([0, 0]))
+        self.assertEqual(lockstep.tick(), bytearray([LANDED_EVENT, 0]))
+        self.assertEqual(lockstep.tick(), bytearray([FROZEN_EVENT, 0]))
+        self.assertEqual(lockstep.tick(), bytearray([MATCHED_EVENT, 0]))
+        self.assertEqual(lockstep.tick()[0] & CLEARED_EVENT, CLEARED_EVENT)
+        self.assertEqual(lockstep.game(0).field().to_lists()[0], ['   '] * 3 + [' Z ', ' Y ', ' Z '])
+
+    def test_moves_are_checked(self):
+        lockstep = Lockstep(self.size, [CompactGameState(self.rows)])
+        lockstep.new_faller(0, Faller(2, 'XYZ'))
+        for _ in range(4):
+            lockstep.tick()
+
+        with self.assertRaises(InvalidMoveError):
+            lockstep.move_faller(0, -1)
+        lockstep.move_faller(0, 1)
+        self.assertEqual(lockstep.game(0).faller().position().column, 3)
+
+    def test_sizes_must_agree(self):
+        with self.assertRaises(ValueError):
+            Lockstep(self.size, [CompactGameState(Size(3, 3))])
+
+if __name__ == "__main__":
+    test.main()
@@ -0,0 +1,86 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+import contextlib
+import io
+import tempfile
+from project4 import *
+
+class InputTests(test.TestCase):
+    def test_lines_are_split_across_chunks(self):
+        lines = list(read_lines(io.StringIO('4\n3\nEMPTY\nF 2 X Y Z\n\n\nQ'), chunk_size = 3))
+        self.assertEqual(lines, ['4', '3', 'EMPTY', 'F 2 X Y Z', '', '', 'Q'])
+
+    def test_file_line_breaks_are_translated(self):
+        with tempfile.TemporaryFile('w+', newline = '') as script:
+            script.write('4\r\n3\r\nEMPTY\r\n\r\nR\n')
+            script.seek(0)
+            self.assertEqual(list(read_lines(script, chunk_size = 4)), ['4', '3', 'EMPTY', '', 'R'])
+
+    def test_commands_are_parsed(self):
+        self.assertEqual(list(parse_commands(['F 3 X Y Z', '', '<', 'Q', 'junk'])),
+            [Command('F', 2, 'XYZ'), Command('', None, None), Command('<', None, None),
+            Command('Q', None, None), Command(None, None, None)])
+
+    def test_run_reads_from_stream(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            run(io.StringIO('2\n1\nEMPTY\nF 1 X Y Z\n\nQ\n'))
+
+        self.assertEqual(output.getvalue().count('---'), 3)
+        self.assertTrue(output.getvalue().endswith('||Y||\n||Z||\n --- \n'))
+
+class _Output(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, text: str) -> int:
+        self.writes.append(text)
+        return super().write(text)
+
+class OutputTests(test.TestCase):
+    def setUp(self):
+        self.game = columns.GameState(columns.Size(3, 2))
+        self.game.new_faller(columns.Faller(0, 'XYZ'))
+
+    def test_field_is_rendered(self):
+        self.assertEqual(render_field(self.game), '|[Z]   |\n|      |\n|      |\n ------ \n')
+        self.assertEqual(render_field(columns.GameState(['X ', 'YZ'])), '| X    |\n| Y  Z |\n ------ \n')
+
+    def test_each_frame_is_one_write(self):
+        output = _Output()
+        frames = FrameWriter(output)
+        frames.write(self.game)
+        self.game.tick()
+        frames.write(self.game)
+        self.assertEqual(output.writes, ['|[Z]   |\n|      |\n|      |\n ------ \n',
+            '|[Y]   |\n|[Z]   |\n|      |\n ------ \n'])
+
+    def test_diff_mode_starts_with_a_whole_frame(self):
+        output = _Output()
+        FrameWriter(output, diff = True).write(self.game)
+        self.assertEqual(output.writes, [render_field(self.game)])
+
+    def test_diff_mode_rewrites_only_changed_rows(self):
+        output = _Output()
+        frames = FrameWriter(output, diff = True)
+        frames.write(self.game)
+        self.game.tick()
+        frames.write(self.game)
+        # each row is reached by moving the cursor up from below
+        # the frame and left by moving back down the same amount
+        self.assertEqual(output.writes[1], '\x1b[4F|[Y]   |\x1b[4E\x1b[3F|[Z]   |\x1b[3E')
+
+        frames.write(self.game)
+        self.assertEqual(len(output.writes), 2)
+
+    def test_diff_mode_writes_a_whole_frame_when_the_size_changes(self):
+        output = _Output()
+        frames = FrameWriter(output, diff = True)
+        frames.write(self.game)
+        frames.write(columns.GameState(['X ']))
+        self.assertEqual(output.writes[1], '| X    |\n ------ \n')
+
+if __name__ == "__main__":
+    test.main()
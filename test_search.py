@@ -0,0 +1,54 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+from search import *
+from compact import CompactGameState
+
+class SearchTests(test.TestCase):
+    def setUp(self):
+        self.test = GameState(\
+            ['   ',
+            '   ',
+            '   ',
+            'X X'])
+
+    def test_search_finds_match(self):
+        result = Searcher(budget = 1).search(self.test, [Faller(0, 'YZX')])
+        self.assertEqual(result.placement, Placement(1, 0))
+        self.assertEqual(result.depth, 1)
+        self.assertEqual(self.test.field().to_lists()[1], ['   '] * 4)
+
+    def test_search_finds_match_after_rotating(self):
+        test = CompactGameState(\
+            ['   ',
+            '   ',
+            '   ',
+            'X X'])
+        result = Searcher(budget = 1).search(test, [Faller(1, 'XYZ')])
+        self.assertEqual(result.placement, Placement(1, 2))
+
+    def test_searched_boards_are_remembered(self):
+        searcher = Searcher(budget = 1)
+        first = searcher.search(self.test, [Faller(0, 'YZX'), Faller(0, 'STV')])
+        second = searcher.search(self.test, [Faller(0, 'YZX'), Faller(0, 'STV')])
+        self.assertEqual(first.depth, 2)
+        self.assertEqual(first[:3], second[:3])
+        self.assertGreater(first.nodes, 0)
+        self.assertEqual(second.nodes, 0)
+
+    def test_evaluation_can_be_replaced(self):
+        searcher = Searcher(lambda game: game.field()[2][-1] == ' Z ', budget = 1)
+        self.assertEqual(searcher.search(GameState(Size(4, 3)), [Faller(0, 'XYZ')]).placement, Placement(2, 0))
+
+    def test_search_answers_when_out_of_time(self):
+        result = Searcher(budget = 0).search(GameState(Size(13, 6)), [Faller(2, 'XYZ'), Faller(2, 'XYZ')])
+        self.assertEqual(result.placement, Placement(2, 0))
+        self.assertEqual(result.depth, 0)
+        self.assertEqual(result.nodes, 1)
+
+    def test_placements_skip_identical_rotations(self):
+        self.assertEqual(placements(Faller(1, 'XXX'), 3), [Placement(1, 0), Placement(0, 0), Placement(2, 0)])
+        self.assertEqual(len(placements(Faller(0, 'XXY'), 3)), 9)
+
+if __name__ == "__main__":
+    test.main()
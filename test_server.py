@@ -0,0 +1,88 @@
+# Alexander Gottuso 87747555
+
+import unittest as test
+import asyncio
+import contextlib
+import io
+import os
+import socket
+import tempfile
+from server import *
+
+def _expected(script: str) -> bytes:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        project4.run(io.StringIO(script))
+
+    return output.getvalue().encode()
+
+async def _play(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, script: str) -> bytes:
+    writer.write(script.encode())
+    await writer.drain()
+    writer.write_eof()
+    output = await reader.read()
+    writer.close()
+    return output
+
+class ServerTests(test.TestCase):
+    def setUp(self):
+        self.scripts = [
+            '4\n3\nEMPTY\nF 3 X Y Z\n\n\n\n\nQ\n',
+            '4\n3\nCONTENTS\n   \n   \n  X\n  X\nF 3 Y Z X\n\nR\n\n\n\n\n',
+            '2\n1\nCONTENTS\nX\nY\nF 1 Z Z Z\n\n',
+            '5\n3\nEMPTY\nF 2 S T V\n<\n\n>\n>\njunk\n\n\n\n\n\n\n']
+
+    def test_games_are_played_like_project4(self):
+        async def play_all() -> ([bytes], int):
+            server = GameServer()
+            host, port = await server.start()
+
+            async def play(script: str) -> bytes:
+                return await _play(*await asyncio.open_connection(host, port), script)
+
+            outputs = await asyncio.gather(*(play(script) for script in self.scripts * 25))
+            await server.close()
+            return outputs, server.batches()
+
+        outputs, batches = asyncio.run(play_all())
+        self.assertEqual(outputs, [_expected(script) for script in self.scripts] * 25)
+        self.assertTrue(outputs[2].endswith(GAME_OVER))
+        self.assertLess(batches, sum(script.count('\n') - 3 for script in self.scripts) * 25)
+
+    @test.skipUnless(hasattr(socket, 'AF_UNIX'), 'needs Unix sockets')
+    def test_games_over_unix_socket(self):
+        async def play(path: str) -> bytes:
+            server = GameServer()
+            await server.start_unix(path)
+            output = await _play(*await asyncio.open_unix_connection(path), self.scripts[0])
+            await server.close()
+            return output
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(asyncio.run(play(os.path.join(directory, 'columns.sock'))), _expected(self.scripts[0]))
+
+    def test_bad_commands_are_ignored(self):
+        async def play() -> bytes:
+            server = GameServer()
+            host, port = await server.start()
+            output = await _play(*await asyncio.open_connection(host, port),
+                '3\n3\nCONTENTS\nX\n\nYZX\nF\nF 9 X Y Z\nF two X Y Z\nF 2 S T V\n\n\n\n\n')
+            await server.close()
+            return output
+
+        self.assertEqual(asyncio.run(play()),
+            _expected('3\n3\nCONTENTS\nX  \n   \nYZX\njunk\njunk\njunk\nF 2 S T V\n\n\n\n\n'))
+
+    def test_bad_setup_closes_connection(self):
+        async def play() -> (bytes, int):
+            server = GameServer()
+            host, port = await server.start()
+            output = await _play(*await asyncio.open_connection(host, port), 'four\n')
+            sessions = server.sessions()
+            await server.close()
+            return output, sessions
+
+        self.assertEqual(asyncio.run(play()), (b'', 0))
+
+if __name__ == "__main__":
+    test.main()